@@ -0,0 +1,306 @@
+import argparse
+import collections
+import hashlib
+import http.server
+import json
+import logging
+import os
+import threading
+import urllib.parse
+
+import streamlit.config
+import streamlit.logger
+
+import carga
+import dashboard
+import ranking
+
+
+#################################################################
+# API de consultas
+#
+# Endereços HTTP/JSON com os agregados do dashboard, para outros sistemas não
+# precisarem renderizar a página: totais por ano, por tipo de população e por
+# região, maiores países e fluxos origem → asilo. As consultas usam os mesmos
+# caches das sessões (carga.py) e as respostas prontas ficam num cache LRU
+# chaveado pela versão dos dados e pelos parâmetros normalizados. O ETag vem da
+# mesma chave: uma revalidação (If-None-Match) é respondida com 304 sem consultar
+# nada. O servidor.py atende a API na porta do /pronto; sem o dashboard:
+#
+#   python api.py [--porta 8502]
+#
+# Parâmetros (todos opcionais):
+#   anos=2010-2023 | 2015    tipos=REF,ASY    fluxo=Origem | Asilo
+#   top=10    campo=RegiaoUNHCR | RegiaoUNSD | SubRegiaoUNSD    regioes=Americas,Europe
+#   porAno=1    pais=Brazil    porTipo=1
+#################################################################
+
+logger = logging.getLogger(__name__)
+
+# quantas respostas manter em memória
+TAMANHO_CACHE = int(os.environ.get('DASHBOARD_CACHE_API', 256))
+
+PORTA_API = int(os.environ.get('DASHBOARD_PORTA_API', 8502))
+
+CAMPOS_REGIAO = ['RegiaoUNHCR', 'RegiaoUNSD', 'SubRegiaoUNSD']
+
+_cache = collections.OrderedDict()
+_travaCache = threading.Lock()
+
+
+class ParametroInvalido(ValueError):
+    pass
+
+
+#################################################################
+# Parâmetros
+#################################################################
+
+def lerAnos(versao, valor):
+    anoMin, anoMax = dashboard.listaIntervaloAno(versao)
+    if valor is None:
+        return (anoMin, anoMax)
+    try:
+        partes = [int(parte) for parte in valor.split('-')]
+    except ValueError:
+        raise ParametroInvalido(f'anos inválido: {valor}')
+    if len(partes) == 1:
+        partes = partes * 2
+    if len(partes) != 2 or partes[0] > partes[1]:
+        raise ParametroInvalido(f'anos inválido: {valor}')
+    inicio, fim = max(partes[0], anoMin), min(partes[1], anoMax)
+    if inicio > fim:
+        raise ParametroInvalido(f'anos fora do período dos dados ({anoMin}-{anoMax}): {valor}')
+    return (inicio, fim)
+
+
+def lerTipos(versao, valor):
+    # na ordem do catálogo, como o filtro do dashboard: a mesma seleção é a mesma chave
+    todos = dashboard.listaTipoPopulacao(versao)
+    if valor is None:
+        return list(todos)
+    pedidos = set(valor.split(','))
+    desconhecidos = pedidos.difference(todos)
+    if desconhecidos:
+        raise ParametroInvalido(f'tipos desconhecidos: {", ".join(sorted(desconhecidos))}')
+    return [tipo for tipo in todos if tipo in pedidos]
+
+
+def lerOpcao(nome, valor, opcoes):
+    if valor is None:
+        return opcoes[0]
+    if valor not in opcoes:
+        raise ParametroInvalido(f'{nome} deve ser um de: {", ".join(opcoes)}')
+    return valor
+
+
+def lerTop(valor):
+    if valor is None:
+        return None
+    if not valor.isdigit() or int(valor) < 1:
+        raise ParametroInvalido(f'top inválido: {valor}')
+    return int(valor)
+
+
+def lerParametros(versao, consulta, texto):
+    # só os parâmetros que a consulta usa, normalizados: entram na chave do cache
+    brutos = {nome: valores[-1] for nome, valores in urllib.parse.parse_qs(texto).items()}
+    parametros = {
+        'anos': lerAnos(versao, brutos.get('anos')),
+        'tipos': lerTipos(versao, brutos.get('tipos')),
+    }
+    usados = CONSULTAS[consulta][1]
+    if 'fluxo' in usados:
+        parametros['fluxo'] = lerOpcao('fluxo', brutos.get('fluxo'), ['Origem', 'Asilo'])
+    if 'top' in usados:
+        parametros['top'] = lerTop(brutos.get('top'))
+    if 'campo' in usados:
+        parametros['campo'] = lerOpcao('campo', brutos.get('campo'), CAMPOS_REGIAO)
+        regiao = parametros['campo'] + parametros['fluxo']
+        todas = dashboard.listaFiltrada(versao, regiao, parametros['anos'], parametros['tipos'])
+        # sem regioes, todas as do filtro (a seleção padrão do dashboard); regiões
+        # do catálogo sem dados no filtro são descartadas, as desconhecidas são erro
+        if 'regioes' in brutos:
+            pedidas = set(brutos['regioes'].split(','))
+            desconhecidas = pedidas.difference(carga.lerCatalogo(versao).get(regiao, []))
+            if desconhecidas:
+                raise ParametroInvalido(f'regioes desconhecidas: {", ".join(sorted(desconhecidas))}')
+            parametros['regioes'] = [valor for valor in todas if valor in pedidas]
+        else:
+            parametros['regioes'] = list(todas)
+    if 'porAno' in usados:
+        parametros['porAno'] = brutos.get('porAno') == '1'
+    if 'pais' in usados:
+        parametros['pais'] = brutos.get('pais')
+        # um país desconhecido é erro, como tipos e regiões; um país do catálogo sem
+        # dados no filtro devolve a lista vazia
+        paises = carga.lerCatalogo(versao).get('NomePais' + parametros['fluxo'], [])
+        if parametros['pais'] is not None and parametros['pais'] not in paises:
+            raise ParametroInvalido(f'pais desconhecido: {parametros["pais"]}')
+    if 'porTipo' in usados:
+        parametros['porTipo'] = brutos.get('porTipo') == '1'
+    return parametros
+
+
+#################################################################
+# Consultas
+#################################################################
+
+def consultaAnos(versao, parametros):
+    # o total por ano não depende do sentido; Origem reaproveita a visão padrão
+    return carga.lerConsultasAbaGeral(versao, parametros['anos'], parametros['tipos'], 'Origem')['ano']
+
+
+def consultaTipos(versao, parametros):
+    return carga.lerConsultasAbaGeral(versao, parametros['anos'], parametros['tipos'], 'Origem')['tipo']
+
+
+def consultaPaises(versao, parametros):
+    paises = carga.lerConsultasAbaGeral(versao, parametros['anos'], parametros['tipos'], parametros['fluxo'])['paises']
+    if parametros['top'] is None:
+        return paises.sort_values('Quantidade', ascending=False)
+    return paises.nlargest(parametros['top'], 'Quantidade')
+
+
+def consultaRegioes(versao, parametros):
+    consultas = carga.lerConsultasAbaRegiao(versao, parametros['anos'], parametros['tipos'],
+                                            parametros['campo'] + parametros['fluxo'], parametros['regioes'])
+    return consultas['anoRegiao' if parametros['porAno'] else 'regiao']
+
+
+def consultaFluxos(versao, parametros):
+    # sem país, os maiores pares entre todos os países (Sankey da aba Fluxo); com
+    # país, os maiores parceiros dele (Sankey do país), com "Outros" para os demais
+    rankingDados = carga.lerRanking(versao, parametros['anos'], parametros['tipos'])
+    fluxo, pais, top = parametros['fluxo'], parametros['pais'], parametros['top']
+    if pais is None:
+        if parametros['porTipo']:
+            return ranking.topPares(rankingDados[(fluxo, True)], top)
+        return dashboard.agruparOutrosPaises(rankingDados, fluxo, top)
+    if parametros['porTipo']:
+        return dashboard.agruparOutrosPaisesTipoPopulacao(rankingDados, fluxo, pais, top)
+    return ranking.topParceiros(rankingDados[(fluxo, False)], pais, top)
+
+
+# consulta: (função, parâmetros além de anos e tipos)
+CONSULTAS = {
+    'anos': (consultaAnos, []),
+    'tipos': (consultaTipos, []),
+    'paises': (consultaPaises, ['fluxo', 'top']),
+    'regioes': (consultaRegioes, ['fluxo', 'campo', 'porAno']),
+    'fluxos': (consultaFluxos, ['fluxo', 'pais', 'top', 'porTipo']),
+}
+
+
+#################################################################
+# Respostas
+#################################################################
+
+def chaveConsulta(versao, consulta, parametros):
+    return json.dumps([versao, consulta, parametros], sort_keys=True)
+
+
+def etagConsulta(chave):
+    # a resposta é determinada pela versão e pelos parâmetros normalizados
+    return '"' + hashlib.sha1(chave.encode('utf-8')).hexdigest()[:20] + '"'
+
+
+def corpoConsulta(versao, consulta, parametros):
+    df = CONSULTAS[consulta][0](versao, parametros)
+    # to_json converte os tipos do numpy e as categorias; o resto vai em json.dumps
+    return ('{"versao": %s, "consulta": %s, "parametros": %s, "dados": %s}' % (
+        json.dumps(versao), json.dumps(consulta), json.dumps(parametros, ensure_ascii=False),
+        df.to_json(orient='records', force_ascii=False))).encode('utf-8')
+
+
+def responder(consulta, texto, etagCliente=None):
+    # (status, corpo, etag)
+    if consulta not in CONSULTAS:
+        return 404, json.dumps({'erro': f'consulta desconhecida: {consulta}',
+                                'consultas': list(CONSULTAS)}).encode('utf-8'), None
+    versao = carga.versaoDados()
+    try:
+        parametros = lerParametros(versao, consulta, texto)
+    except ParametroInvalido as erro:
+        return 400, json.dumps({'erro': str(erro)}, ensure_ascii=False).encode('utf-8'), None
+
+    chave = chaveConsulta(versao, consulta, parametros)
+    etag = etagConsulta(chave)
+    if etagCliente is not None and etag in [valor.strip() for valor in etagCliente.split(',')]:
+        return 304, b'', etag
+
+    with _travaCache:
+        if chave in _cache:
+            _cache.move_to_end(chave)
+            return 200, _cache[chave], etag
+
+    # pedidos simultâneos da mesma consulta podem montar o corpo em dobro; as
+    # consultas por trás (carga.py) calculam cada filtro uma vez só
+    corpo = corpoConsulta(versao, consulta, parametros)
+    with _travaCache:
+        _cache[chave] = corpo
+        if len(_cache) > TAMANHO_CACHE:
+            _cache.popitem(last=False)
+    return 200, corpo, etag
+
+
+class Consultas(http.server.BaseHTTPRequestHandler):
+    # GET /api/<consulta>?<parâmetros>
+    def do_GET(self):
+        caminho, _, texto = self.path.partition('?')
+        if not caminho.startswith('/api/'):
+            self.send_error(404)
+            return
+        threading.current_thread().name = 'api'
+        try:
+            status, corpo, etag = responder(caminho[len('/api/'):], texto, self.headers.get('If-None-Match'))
+        except Exception:
+            logger.exception('Falha na consulta %s', self.path)
+            self.send_error(500)
+            return
+        self.send_response(status)
+        if etag is not None:
+            self.send_header('ETag', etag)
+            # o cliente pode guardar a resposta, mas revalida a cada uso: a versão
+            # dos dados pode mudar a qualquer momento
+            self.send_header('Cache-Control', 'no-cache')
+        if status != 304:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        logger.debug(formato, *args)
+
+
+def iniciarApi(porta=PORTA_API, tratador=Consultas):
+    carga.silenciarAvisosSemSessao()
+    servidor = http.server.ThreadingHTTPServer(('', porta), tratador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name='api-servidor', daemon=True).start()
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description='API HTTP/JSON com os agregados do dashboard.')
+    parser.add_argument('--porta', type=int, default=PORTA_API)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    # fora do `streamlit run` os caches do carga.py funcionam sem sessão e apenas
+    # avisam disso; o nível do log é aplicado depois da leitura da configuração,
+    # que o redefiniria
+    streamlit.config.get_option('logger.level')
+    streamlit.logger.set_log_level('error')
+    servidor = iniciarApi(args.porta)
+    logger.info('API em http://localhost:%d/api/', args.porta)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
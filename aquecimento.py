@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import threading
+import time
+
+import carga
+import dashboard
+import indice
+import perfil
+
+
+#################################################################
+# Aquecimento
+#
+# Executado pelo servidor.py quando o servidor sobe, fora de qualquer sessão:
+# baixa e carrega os dados e preenche os caches compartilhados (carga.py) da
+# visão padrão (todo o período, todos os tipos, Origem) e dos filtros populares,
+# incluindo o ranking dos maiores países para o Sankey. Os gráficos da visão
+# padrão são montados uma vez (a primeira figura do Plotly e do Altair carrega os
+# validadores). Ao final a instância é marcada como pronta. Uma versão nova dos
+# dados (atualização ou preprocessar.py --incremental) é aquecida do mesmo modo
+# antes de as sessões trocarem para ela (carga.versaoDados).
+#################################################################
+
+logger = logging.getLogger(__name__)
+
+# arquivo JSON com os filtros populares a aquecer além da visão padrão, ex.:
+#   [{"anos": [2010, 2023], "tipos": ["REF"], "fluxo": "Asilo"}]
+# anos e tipos ausentes valem todo o período e todos os tipos; fluxo, Origem
+ARQUIVO_AQUECIMENTO = os.environ.get('DASHBOARD_AQUECIMENTO', '')
+
+# quantos dos maiores países de cada filtro têm o Sankey montado
+PAISES_AQUECIMENTO = int(os.environ.get('DASHBOARD_AQUECIMENTO_PAISES', 10))
+
+# espera entre tentativas quando o aquecimento falha (ex.: origem dos dados fora do ar)
+INTERVALO_TENTATIVAS = 60
+
+CAMPOS_REGIAO = ['RegiaoUNHCR', 'RegiaoUNSD', 'SubRegiaoUNSD']
+
+_pronto = threading.Event()
+_estado = {'pronto': False, 'versao': None, 'filtros': 0, 'segundos': None, 'erro': None}
+_travaEstado = threading.Lock()
+
+
+def estado():
+    with _travaEstado:
+        return dict(_estado)
+
+
+def pronto():
+    return _pronto.is_set()
+
+
+def esperarPronto(timeout=None):
+    return _pronto.wait(timeout)
+
+
+def lerFiltrosPopulares(arquivo=ARQUIVO_AQUECIMENTO):
+    if not arquivo:
+        return []
+    try:
+        with open(arquivo, encoding='utf-8') as entrada:
+            return json.load(entrada)
+    except (OSError, ValueError) as erro:
+        logger.warning('Filtros de aquecimento ignorados (%s): %s', arquivo, erro)
+        return []
+
+
+def filtrosAquecimento(versao, populares):
+    # os filtros na forma que os widgets do dashboard produzem, para as chaves
+    # de cache coincidirem: anos em tupla e tipos na ordem do catálogo
+    anoMin, anoMax = dashboard.listaIntervaloAno(versao)
+    todosTipos = dashboard.listaTipoPopulacao(versao)
+    filtros = [((anoMin, anoMax), list(todosTipos), 'Origem')]
+    for filtro in populares:
+        anos = tuple(int(ano) for ano in filtro.get('anos', (anoMin, anoMax)))
+        tipos = [tipo for tipo in todosTipos if tipo in filtro.get('tipos', todosTipos)]
+        filtro = (anos, tipos, filtro.get('fluxo', 'Origem'))
+        if filtro not in filtros:
+            filtros.append(filtro)
+    return filtros
+
+
+def aquecerFiltro(versao, filtroAnos, filtroTP, filtroFluxo, graficos):
+    indice.filtrarIndice(carga.lerIndice(versao), filtroAnos, filtroTP)
+    consultas = carga.lerConsultasAbaGeral(versao, filtroAnos, filtroTP, filtroFluxo)
+    for campo in CAMPOS_REGIAO:
+        regiao = campo + filtroFluxo
+        carga.lerConsultasAbaRegiao(versao, filtroAnos, filtroTP, regiao,
+                                    dashboard.listaFiltrada(versao, regiao, filtroAnos, filtroTP))
+    rankingDados = carga.lerRanking(versao, filtroAnos, filtroTP)
+
+    # os maiores países do sentido escolhido, como na aba Fluxo Origem/Asilo
+    paises = consultas['paises'].nlargest(PAISES_AQUECIMENTO, 'Quantidade')['NomePais' + filtroFluxo]
+    for pais in paises:
+        df_pais = dashboard.agruparOutrosPaisesTipoPopulacao(rankingDados, filtroFluxo, pais, 10)
+        if graficos:
+            dashboard.refugiadosPorPaisTipoPopulacao(df_pais)
+
+    if graficos:
+        dashboard.refugiadosPorTipo(consultas['tipo'])
+        dashboard.topNRefugiados(consultas['paises'], 10, filtroFluxo, 'Top 10')
+        dashboard.refugiadosPorAno(consultas['ano'])
+
+
+def aquecerVersao(versao):
+    # estruturas da versão e consultas dos filtros populares; retorna quantos filtros
+    with perfil.etapa('carga'):
+        carga.lerIndice(versao)
+        carga.lerCubo(versao)
+        carga.lerCatalogo(versao)
+        carga.lerCentroides(versao)
+    perfil.anotar('versao', versao)
+
+    filtros = filtrosAquecimento(versao, lerFiltrosPopulares())
+    for posicao, (filtroAnos, filtroTP, filtroFluxo) in enumerate(filtros):
+        with perfil.etapa(f'filtro{posicao}'):
+            # só a visão padrão monta os gráficos; nos demais filtros bastam os caches
+            aquecerFiltro(versao, filtroAnos, filtroTP, filtroFluxo, graficos=posicao == 0)
+    return len(filtros)
+
+
+def aquecer():
+    inicio = time.perf_counter()
+    with perfil.execucao('aquecimento'):
+        versao = carga.versaoDados()
+        filtros = aquecerVersao(versao)
+
+    with _travaEstado:
+        _estado.update(pronto=True, versao=versao, filtros=filtros,
+                       segundos=round(time.perf_counter() - inicio, 2), erro=None)
+    _pronto.set()
+    logger.info('Aquecimento concluído: versão %s, %d filtros em %.1f s', versao, filtros, _estado['segundos'])
+
+
+def aquecerTroca(versao):
+    # chamado por carga.versaoDados numa thread quando o manifesto aponta para uma
+    # versão nova: as sessões só passam a usá-la depois disto
+    inicio = time.perf_counter()
+    with perfil.execucao('aquecimento'):
+        filtros = aquecerVersao(versao)
+    with _travaEstado:
+        _estado.update(versao=versao, filtros=filtros, segundos=round(time.perf_counter() - inicio, 2))
+    logger.info('Versão %s aquecida para a troca: %d filtros em %.1f s', versao, filtros, _estado['segundos'])
+
+
+def _aquecerAtePronto():
+    while True:
+        try:
+            aquecer()
+            return
+        except Exception as erro:
+            logger.exception('Falha no aquecimento; nova tentativa em %d s', INTERVALO_TENTATIVAS)
+            with _travaEstado:
+                _estado['erro'] = str(erro)
+            time.sleep(INTERVALO_TENTATIVAS)
+
+
+def iniciarAquecimento():
+    carga.silenciarAvisosSemSessao()
+    thread = threading.Thread(target=_aquecerAtePronto, name='aquecimento', daemon=True)
+    thread.start()
+    return thread
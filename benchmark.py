@@ -0,0 +1,348 @@
+import argparse
+import datetime
+import json
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import streamlit.config
+import streamlit.logger
+
+import carga
+import catalogo
+import cubo
+import dados
+import dashboard
+import graficos
+import hierarquia
+import indice
+import mapa
+import paralelo
+import ranking
+
+
+#################################################################
+# Benchmark
+#
+# Executa as funções de dados e de gráficos do dashboard sem abrir a página
+# (o Streamlit roda em modo "bare": os st.* não desenham nada). Os dados são
+# sintéticos, com o mesmo esquema do CSV, em múltiplos do tamanho real.
+#
+#   python benchmark.py --escalas 1 10 100 --saida benchmark.jsonl
+#################################################################
+
+# ordem de grandeza do dados-processados.csv publicado
+LINHAS_REAIS = 120_000
+
+ANOS = (1951, 2023)
+
+TIPOS_POPULACAO = dados.TIPOS_POPULACAO
+
+REGIOES_UNHCR = ['Americas', 'Asia and the Pacific', 'East and Horn of Africa', 'Europe',
+                 'Middle East and North Africa', 'Southern Africa', 'West and Central Africa']
+
+REGIOES_UNSD = ['Africa', 'Americas', 'Asia', 'Europe', 'Oceania']
+
+TOTAL_PAISES = 200
+
+TOTAL_SUBREGIOES = 17
+
+TOTAL_REGIOES_SGD = 8
+
+# seleções típicas de quem navega pelo dashboard: (anos, tipos, fluxo)
+SEQUENCIA_FILTROS = [
+    (ANOS, TIPOS_POPULACAO, 'Origem'),
+    (ANOS, TIPOS_POPULACAO, 'Asilo'),
+    ((2000, 2023), TIPOS_POPULACAO, 'Origem'),
+    ((2010, 2023), ['REF'], 'Origem'),
+    ((2010, 2023), ['REF', 'ASY'], 'Asilo'),
+    ((1990, 2000), ['OIP', 'ROC'], 'Origem'),
+    ((2020, 2023), ['ASY'], 'Asilo'),
+    ((1951, 1980), TIPOS_POPULACAO, 'Origem'),
+]
+
+PERCENTIS = [50, 95, 99]
+
+
+#################################################################
+# Dados sintéticos
+#################################################################
+
+def categoria(codigos, categorias):
+    return pd.Categorical.from_codes(codigos, categories=categorias)
+
+
+def gerarPaises(rng):
+    indices = np.arange(TOTAL_PAISES)
+    return {
+        'Pais': [f'P{i:02X}' for i in indices],
+        'NomePais': [f'Pais{i:03d}' for i in indices],
+        'RegiaoUNHCR': indices % len(REGIOES_UNHCR),
+        'RegiaoUNSD': indices % len(REGIOES_UNSD),
+        'SubRegiaoUNSD': indices % TOTAL_SUBREGIOES,
+        'RegiaoSGD': indices % TOTAL_REGIOES_SGD,
+        'Latitude': rng.uniform(-60, 70, TOTAL_PAISES).astype('float32'),
+        'Longitude': rng.uniform(-180, 180, TOTAL_PAISES).astype('float32'),
+    }
+
+
+def colunasPais(paises, sorteio, sentido):
+    # as colunas de um sentido (Origem | Asilo) derivadas do país sorteado em cada linha
+    return {
+        'Pais' + sentido: categoria(sorteio, paises['Pais']),
+        'NomePais' + sentido: categoria(sorteio, paises['NomePais']),
+        'SiglaPais' + sentido: categoria(sorteio, paises['Pais']),
+        'RegiaoUNHCR' + sentido: categoria(paises['RegiaoUNHCR'][sorteio], REGIOES_UNHCR),
+        'RegiaoUNSD' + sentido: categoria(paises['RegiaoUNSD'][sorteio], REGIOES_UNSD),
+        'SubRegiaoUNSD' + sentido: categoria(paises['SubRegiaoUNSD'][sorteio], [f'Sub{i}' for i in range(TOTAL_SUBREGIOES)]),
+        'RegiaoSGD' + sentido: categoria(paises['RegiaoSGD'][sorteio], [f'SGD{i}' for i in range(TOTAL_REGIOES_SGD)]),
+        'Latitude' + sentido: paises['Latitude'][sorteio],
+        'Longitude' + sentido: paises['Longitude'][sorteio],
+    }
+
+
+def gerarDados(linhas, semente=0):
+    # Mesmo esquema e tipos de dados.lerCsvTipado. Poucos países concentram a maior
+    # parte das linhas e os anos recentes têm mais registros, como nos dados reais.
+    rng = np.random.default_rng(semente)
+    paises = gerarPaises(rng)
+
+    pesosPaises = 1 / np.arange(1, TOTAL_PAISES + 1)
+    pesosPaises /= pesosPaises.sum()
+    anos = np.arange(ANOS[0], ANOS[1] + 1)
+    pesosAnos = np.linspace(1, 10, len(anos))
+    pesosAnos /= pesosAnos.sum()
+
+    colunas = {'Ano': rng.choice(anos, linhas, p=pesosAnos)}
+    colunas.update(colunasPais(paises, rng.choice(TOTAL_PAISES, linhas, p=pesosPaises), 'Origem'))
+    colunas.update(colunasPais(paises, rng.choice(TOTAL_PAISES, linhas, p=pesosPaises), 'Asilo'))
+    colunas['TipoPopulacao'] = categoria(rng.integers(0, len(TIPOS_POPULACAO), linhas), TIPOS_POPULACAO)
+    colunas['Quantidade'] = np.ceil(rng.lognormal(5, 2.5, linhas)).astype('int64')
+
+    df = pd.DataFrame(colunas)
+    for coluna in dados.COLUNAS_INTEIRAS:
+        df[coluna] = pd.to_numeric(df[coluna], downcast='integer')
+    return df
+
+
+#################################################################
+# Medição
+#################################################################
+
+def tamanhoGrafico(grafico):
+    # bytes do spec enviado ao navegador (Altair: spec + dados compactados, como no
+    # exibirGrafico; Plotly: figura em JSON)
+    if grafico is None:
+        return None
+    if hasattr(grafico, 'to_plotly_json'):
+        return len(grafico.to_json().encode('utf-8'))
+    return graficos.medirGrafico(graficos.compactarGrafico(grafico))[1]
+
+
+def medir(funcao, *args, **kwargs):
+    inicio = time.perf_counter()
+    resultado = funcao(*args, **kwargs)
+    return resultado, time.perf_counter() - inicio
+
+
+def medirPico(funcao, *args, **kwargs):
+    # pico de memória alocada durante a chamada (tracemalloc deixa a chamada mais
+    # lenta, por isso o tempo é medido numa passagem separada)
+    tracemalloc.start()
+    try:
+        funcao(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+class Medicoes:
+
+    def __init__(self):
+        self.tempos = {}
+        self.picos = {}
+        self.tamanhos = {}
+
+    def registrar(self, nome, funcao, *args, medirMemoria=False, **kwargs):
+        resultado, segundos = medir(funcao, *args, **kwargs)
+        self.tempos.setdefault(nome, []).append(segundos)
+        if medirMemoria:
+            self.picos[nome] = max(self.picos.get(nome, 0), medirPico(funcao, *args, **kwargs))
+        return resultado
+
+    def registrarGrafico(self, nome, funcao, *args, medirMemoria=False, **kwargs):
+        grafico = self.registrar(nome, funcao, *args, medirMemoria=medirMemoria, **kwargs)
+        self.tamanhos.setdefault(nome, []).append(tamanhoGrafico(grafico))
+        return grafico
+
+    def relatorio(self):
+        linhas = []
+        for nome, tempos in self.tempos.items():
+            milissegundos = np.array(tempos) * 1000
+            tamanhos = [tamanho for tamanho in self.tamanhos.get(nome, []) if tamanho is not None]
+            linha = {'Função': nome, 'Chamadas': len(tempos)}
+            linha.update({f'p{p} ms': round(float(np.percentile(milissegundos, p)), 2) for p in PERCENTIS})
+            linha['Pico MB'] = round(self.picos[nome] / 1e6, 2) if nome in self.picos else None
+            linha['Spec KB'] = round(statistics.median(tamanhos) / 1e3, 1) if tamanhos else None
+            linhas.append(linha)
+        return pd.DataFrame(linhas)
+
+
+#################################################################
+# Cenários
+#################################################################
+
+def construir(df, medicoes, medirMemoria):
+    # estruturas calculadas uma vez por versão dos dados (cache_resource no dashboard)
+    indiceDados = medicoes.registrar('indice.construirIndice', indice.construirIndice, df, medirMemoria=medirMemoria)
+    cuboDados = medicoes.registrar('cubo.construirCubo', cubo.construirCubo, df, medirMemoria=medirMemoria)
+    estrutura = medicoes.registrar('hierarquia.construirEstrutura', hierarquia.construirEstrutura, cuboDados,
+                                   medirMemoria=medirMemoria)
+    medicoes.registrar('catalogo.construirCatalogo', catalogo.construirCatalogo, df, medirMemoria=medirMemoria)
+    centroides = {sentido: medicoes.registrar('mapa.construirCentroides', mapa.construirCentroides, df, sentido,
+                                              medirMemoria=medirMemoria)
+                  for sentido in ['Origem', 'Asilo']}
+    return indiceDados, cuboDados, estrutura, centroides
+
+
+def maiorPais(df, sentido):
+    totais = df.groupby('NomePais' + sentido, observed=True)['Quantidade'].sum()
+    return totais.idxmax() if len(totais) else None
+
+
+def filtrarSemMemo(indiceDados, filtroAnos, filtroTP):
+    # o índice guarda os últimos filtros; a medição é sempre do filtro calculado
+    indiceDados['memo'].clear()
+    return dashboard.filtroAnoTipoPopulacao(indiceDados, filtroAnos, filtroTP)
+
+
+def reproduzirFiltro(indiceDados, cuboDados, estrutura, centroides, filtro, medicoes, medirMemoria):
+    filtroAnos, filtroTP, filtroFluxo = filtro
+    registrar = lambda nome, funcao, *args: medicoes.registrar(nome, funcao, *args, medirMemoria=medirMemoria)
+    grafico = lambda nome, funcao, *args: medicoes.registrarGrafico(nome, funcao, *args, medirMemoria=medirMemoria)
+
+    df_filtrado = registrar('filtroAnoTipoPopulacao', filtrarSemMemo, indiceDados, filtroAnos, filtroTP)
+
+    # aba geral
+    consultas = registrar('consultasAbaGeral', carga.consultasAbaGeral, cuboDados, filtroAnos, filtroTP, filtroFluxo)
+    grafico('refugiadosPorTipo', dashboard.refugiadosPorTipo, consultas['tipo'])
+    df_paises = consultas['paises']
+    grafico('topNRefugiados', dashboard.topNRefugiados, df_paises, 10, filtroFluxo, 'Top 10')
+    grafico('refugiadosPorAno', dashboard.refugiadosPorAno, consultas['ano'])
+    # cada consulta ao cubo medida à parte, sob a dimensão que pede: o tempo de
+    # consultasAbaGeral é o da mais lenta quando rodam em paralelo
+    for dimensao in ['TipoPopulacao', 'SiglaPais' + filtroFluxo, 'NomePais' + filtroFluxo, 'Ano']:
+        registrar(f'cubo.consultarCubo[{dimensao}]', cubo.consultarCubo, cuboDados, [dimensao], filtroAnos, filtroTP)
+
+    # abas de regiões, com todas as regiões selecionadas (a hierarquia é montada
+    # uma vez por filtro para as três abas); o maior continente é detalhado
+    hierarquiaDados = registrar('hierarquia.construirHierarquia', hierarquia.construirHierarquia,
+                                estrutura, filtroAnos, filtroTP)
+    for campo in ['RegiaoUNHCR', 'RegiaoUNSD', 'SubRegiaoUNSD']:
+        regiao = campo + filtroFluxo
+        regioes = list(cuboDados[regiao][regiao].cat.categories)
+        consultas = registrar('consultasAbaRegiao', carga.consultasAbaRegiao, hierarquiaDados, regiao, regioes)
+        grafico('refugiadosPorRegiao', dashboard.refugiadosPorRegiao, consultas['regiao'], regiao)
+        grafico('refugiadosPorAnoRegiao', dashboard.refugiadosPorAnoRegiao, consultas['anoRegiao'], regiao)
+        if campo == 'RegiaoUNSD' and len(consultas['regiao']):
+            continente = consultas['regiao'].nlargest(1, 'Quantidade')[regiao].iloc[0]
+            registrar('hierarquia.detalharValor', hierarquia.detalharValor, hierarquiaDados, regiao, continente)
+
+    # mapa
+    df_mapa = registrar('mapa.pontosMapa', mapa.pontosMapa, df_paises, centroides[filtroFluxo])
+    grafico('refugiadosMapaMundi', dashboard.refugiadosMapaMundi, df_mapa, dashboard.lerMapaMundi(), filtroFluxo, 'Mapa')
+
+    # Sankey: todos os fluxos do filtro e fluxos do maior país do sentido escolhido
+    # (o ranking é calculado uma vez por filtro; cada país e N é uma consulta)
+    rankingDados = registrar('ranking.construirRanking', ranking.construirRanking, df_filtrado)
+    df_top = registrar('agruparOutrosPaises', dashboard.agruparOutrosPaises, rankingDados, filtroFluxo, 10)
+    grafico('refugiadosPorPais', dashboard.refugiadosPorPais, df_top)
+
+    pais = maiorPais(df_paises, filtroFluxo)
+    df_pais_top = registrar('agruparOutrosPaisesTipoPopulacao', dashboard.agruparOutrosPaisesTipoPopulacao,
+                            rankingDados, filtroFluxo, pais, 10)
+    grafico('refugiadosPorPaisTipoPopulacao', dashboard.refugiadosPorPaisTipoPopulacao, df_pais_top)
+
+
+def executarEscala(escala, linhas, repeticoes, lerCsv, semente):
+    total = int(linhas * escala)
+    df = gerarDados(total, semente)
+    medicoes = Medicoes()
+
+    if lerCsv:
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, dados.ARQUIVO_DADOS)
+            df.to_csv(caminho, sep=';', index=False)
+            df = medicoes.registrar('dados.lerCsvTipado', dados.lerCsvTipado, caminho, medirMemoria=True)
+            particoes = os.path.join(diretorio, dados.DIR_PARTICOES)
+            dados.gravarParticoes(df, particoes)
+            medicoes.registrar('dados.lerParticoes', dados.lerParticoes, particoes, medirMemoria=True)
+            medicoes.registrar('dados.lerParticoes (5 anos)', dados.lerParticoes, particoes, (ANOS[1] - 4, ANOS[1]),
+                               medirMemoria=True)
+
+    memoria = int(df.memory_usage(index=False, deep=True).sum())
+    indiceDados, cuboDados, estrutura, centroides = construir(df, medicoes, medirMemoria=True)
+
+    # a primeira passagem mede o pico de memória; as demais, só o tempo
+    for repeticao in range(repeticoes):
+        for filtro in SEQUENCIA_FILTROS:
+            reproduzirFiltro(indiceDados, cuboDados, estrutura, centroides, filtro, medicoes, medirMemoria=repeticao == 0)
+
+    relatorio = medicoes.relatorio()
+    relatorio.insert(0, 'Linhas', total)
+    relatorio.insert(0, 'Escala', escala)
+    return relatorio, memoria
+
+
+#################################################################
+# Principal
+#################################################################
+
+def argumentos():
+    parser = argparse.ArgumentParser(description='Benchmark das funções de dados e gráficos do dashboard')
+    parser.add_argument('--escalas', type=float, nargs='+', default=[1, 10, 100],
+                        help='múltiplos do número de linhas reais (padrão: 1 10 100)')
+    parser.add_argument('--linhas', type=int, default=LINHAS_REAIS,
+                        help=f'número de linhas reais (padrão: {LINHAS_REAIS})')
+    parser.add_argument('--repeticoes', type=int, default=3,
+                        help='quantas vezes a sequência de filtros é reproduzida (padrão: 3)')
+    parser.add_argument('--csv', action='store_true',
+                        help='mede também a leitura do CSV e das partições (grava os arquivos sintéticos antes)')
+    parser.add_argument('--trabalhadores', type=int, default=paralelo.TRABALHADORES,
+                        help=f'threads das consultas em paralelo; 1 executa em sequência (padrão: {paralelo.TRABALHADORES})')
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--saida', help='arquivo JSON lines ao qual os resultados são acrescentados')
+    return parser.parse_args()
+
+
+def main():
+    args = argumentos()
+    paralelo.TRABALHADORES = args.trabalhadores
+
+    # os st.* fora do `streamlit run` apenas avisam que não há sessão; o nível do
+    # log é aplicado depois da leitura da configuração, que o redefiniria
+    streamlit.config.get_option('logger.level')
+    streamlit.logger.set_log_level('error')
+
+    data = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+    for escala in args.escalas:
+        relatorio, memoria = executarEscala(escala, args.linhas, args.repeticoes, args.csv, args.semente)
+
+        linhas = f'{relatorio["Linhas"].iloc[0]:,}'.replace(',', '.')
+        print(f'\nEscala {escala:g}× ({linhas} linhas, {memoria / 1e6:.1f} MB)')
+        print(relatorio.drop(columns=['Escala', 'Linhas']).to_string(index=False))
+
+        if args.saida:
+            with open(args.saida, 'a', encoding='utf-8') as arquivo:
+                # colunas sem valor (ex.: Spec KB de funções que não geram gráfico) viram null
+                for registro in relatorio.astype(object).where(relatorio.notna(), None).to_dict(orient='records'):
+                    registro.update({'Data': data, 'MemoriaDados': memoria})
+                    arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+
+
+if __name__ == '__main__':
+    main()
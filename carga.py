@@ -0,0 +1,178 @@
+import logging
+import os
+import threading
+
+import streamlit as st
+
+import catalogo
+import cubo
+import dados
+import derivados
+import hierarquia
+import indice
+import mapa
+import paralelo
+import perfil
+import ranking
+
+
+#################################################################
+# Estruturas em cache
+#
+# Dados, índice, cubo e as consultas de cada aba, em cache por versão dos dados
+# (e por filtro, nas consultas). Ficam num módulo importável, fora do
+# dashboard.py: o Streamlit identifica o cache pelo módulo e pelo nome da função,
+# e o script da página é executado como __main__. Assim o aquecimento
+# (aquecimento.py), que roda fora de qualquer sessão, preenche as mesmas entradas
+# que as sessões consultam.
+#################################################################
+
+logger = logging.getLogger(__name__)
+
+# threads que chamam as funções em cache fora de uma sessão (aquecimento.py, api.py):
+# nelas os avisos do Streamlit sobre a falta de sessão são esperados
+THREADS_SEM_SESSAO = {'aquecimento', 'api'}
+
+LOGGERS_SEM_SESSAO = ['streamlit.runtime.scriptrunner_utils.script_run_context', 'streamlit.deprecation_util']
+
+
+class _FiltroSemSessao(logging.Filter):
+    def filter(self, registro):
+        return registro.threadName not in THREADS_SEM_SESSAO
+
+
+def silenciarAvisosSemSessao():
+    for nome in LOGGERS_SEM_SESSAO:
+        logger = logging.getLogger(nome)
+        if not any(isinstance(filtro, _FiltroSemSessao) for filtro in logger.filters):
+            logger.addFilter(_FiltroSemSessao())
+
+
+# versão servida às sessões e versão nova em aquecimento (ver versaoDados)
+_versoes = {'ativa': None, 'aquecendo': None}
+_travaVersoes = threading.Lock()
+
+
+def versaoManifesto():
+    # leitura barata do manifesto local; a atualização (se necessária) ocorre em segundo plano
+    return dados.garantirDados()['versao']
+
+
+def versaoDados():
+    # Quando o manifesto passa a apontar para outra versão (atualização em segundo
+    # plano ou preprocessar.py --incremental), as sessões continuam na versão ativa
+    # enquanto a nova é aquecida numa thread, e trocam com os caches já prontos: sem
+    # isso a primeira execução de cada processo releria e reindexaria tudo. A versão
+    # ativa continua em disco (dados.VERSOES_MANTIDAS); se tiver sido removida, a
+    # troca é imediata.
+    versao = versaoManifesto()
+    with _travaVersoes:
+        ativa = _versoes['ativa']
+        if ativa is None or not os.path.isdir(dados.caminhoVersao(ativa)):
+            _versoes['ativa'] = ativa = versao
+        elif versao != ativa and _versoes['aquecendo'] != versao:
+            _versoes['aquecendo'] = versao
+            threading.Thread(target=_trocarVersao, args=(versao,), name='aquecimento', daemon=True).start()
+    return ativa
+
+
+def _trocarVersao(versao):
+    silenciarAvisosSemSessao()
+    try:
+        # importado aqui: o aquecimento usa este módulo e o dashboard
+        import aquecimento
+        aquecimento.aquecerTroca(versao)
+    except Exception:
+        logger.exception('Falha ao aquecer a versão %s; as sessões trocam sem o aquecimento', versao)
+    with _travaVersoes:
+        # uma versão ainda mais nova pode ter começado a ser aquecida nesse meio tempo
+        if _versoes['aquecendo'] == versao:
+            _versoes.update(ativa=versao, aquecendo=None)
+
+# a versão faz parte da chave do cache: quando a atualização em segundo plano
+# troca os dados, a próxima execução lê a nova cópia local (ou mapeia o novo arquivo
+# compartilhado). cache_resource devolve o mesmo DataFrame sem copiá-lo; ele só é
+# lido pelas estruturas abaixo.
+@perfil.emCache(st.cache_resource(max_entries=2))
+def lerDados(versao):
+    if dados.MEMORIA_COMPARTILHADA:
+        return dados.lerDadosCompartilhados(versao)
+    return dados.lerVersao(versao)
+
+# cubo de agregados calculado uma vez por versão dos dados; cache_resource evita
+# copiar as tabelas a cada execução (o cubo é somente leitura). Versões
+# pré-processadas trazem o cubo, as coordenadas e o catálogo prontos (derivados.py).
+@perfil.emCache(st.cache_resource(max_entries=2))
+def lerCubo(versao):
+    if derivados.derivadosDisponiveis(versao):
+        return derivados.lerCubo(versao)
+    return cubo.construirCubo(lerDados(versao))
+
+# linhas ordenadas por (TipoPopulacao, Ano) com as posições de cada bloco
+@perfil.emCache(st.cache_resource(max_entries=2))
+def lerIndice(versao):
+    return indice.construirIndice(lerDados(versao))
+
+# coordenadas de cada país, calculadas uma vez por versão dos dados
+@perfil.emCache(st.cache_resource(max_entries=2))
+def lerCentroides(versao):
+    if derivados.derivadosDisponiveis(versao):
+        return derivados.lerCentroides(versao)
+    df = lerDados(versao)
+    return {sentido: mapa.construirCentroides(df, sentido) for sentido in ['Origem', 'Asilo']}
+
+# catálogo de dimensões por versão dos dados: as listas do dashboard são chaveadas
+# pela versão (uma string) em vez do conteúdo do DataFrame
+@perfil.emCache(st.cache_resource(max_entries=2))
+def lerCatalogo(versao):
+    if derivados.derivadosDisponiveis(versao):
+        return derivados.lerCatalogo(versao)
+    return catalogo.construirCatalogo(lerDados(versao))
+
+# posição de cada valor da hierarquia geográfica no nível de cima, por versão dos dados
+@perfil.emCache(st.cache_resource(max_entries=2))
+def lerEstruturaHierarquia(versao):
+    return hierarquia.construirEstrutura(lerCubo(versao))
+
+# totais de cada nível da hierarquia, dos dois sentidos, montados uma vez por filtro
+# e compartilhados pelas abas de região e pelo detalhamento (hierarquia.py)
+@perfil.emCache(st.cache_resource(max_entries=16))
+def lerHierarquia(versao, filtroAnos, filtroTP):
+    return hierarquia.construirHierarquia(lerEstruturaHierarquia(versao), filtroAnos, filtroTP)
+
+# parceiros de cada país já ordenados, calculados uma vez por filtro: trocar o país
+# ou o número de parceiros exibidos é uma consulta ao ranking (ranking.py)
+@perfil.emCache(st.cache_resource(max_entries=8))
+def lerRanking(versao, filtroAnos, filtroTP):
+    return ranking.construirRanking(indice.filtrarIndice(lerIndice(versao), filtroAnos, filtroTP))
+
+
+#################################################################
+# Consultas das abas
+#################################################################
+
+# consultas independentes da aba geral, calculadas juntas (paralelo.py)
+def consultasAbaGeral(cuboDados, filtroAnos, filtroTP, filtroFluxo):
+    return paralelo.executar({
+        'tipo': (cubo.consultarCubo, cuboDados, ['TipoPopulacao'], filtroAnos, filtroTP),
+        'siglas': (cubo.consultarCubo, cuboDados, ['SiglaPais' + filtroFluxo], filtroAnos, filtroTP),
+        'paises': (cubo.consultarCubo, cuboDados, ['NomePais' + filtroFluxo], filtroAnos, filtroTP),
+        'ano': (cubo.consultarCubo, cuboDados, ['Ano'], filtroAnos, filtroTP),
+    })
+
+# totais por região e por ano e região, selecionados na hierarquia do filtro
+def consultasAbaRegiao(hierarquiaDados, regiao, filtroRegioes):
+    return {
+        'regiao': hierarquia.consultarNivel(hierarquiaDados, regiao, filtroRegioes),
+        'anoRegiao': hierarquia.consultarNivel(hierarquiaDados, regiao, filtroRegioes, porAno=True),
+    }
+
+# os resultados são pequenos e compartilhados entre sessões (somente leitura): um
+# filtro já consultado por alguém, ou pelo aquecimento, não é recalculado
+@perfil.emCache(st.cache_resource(max_entries=64))
+def lerConsultasAbaGeral(versao, filtroAnos, filtroTP, filtroFluxo):
+    return consultasAbaGeral(lerCubo(versao), filtroAnos, filtroTP, filtroFluxo)
+
+@perfil.emCache(st.cache_resource(max_entries=64))
+def lerConsultasAbaRegiao(versao, filtroAnos, filtroTP, regiao, filtroRegioes):
+    return consultasAbaRegiao(lerHierarquia(versao, filtroAnos, filtroTP), regiao, filtroRegioes)
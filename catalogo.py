@@ -0,0 +1,35 @@
+import pandas as pd
+
+import dados
+
+
+#################################################################
+# Catálogo de dimensões
+#
+# Valores distintos de cada dimensão, calculados uma vez por versão dos dados.
+# Listas que dependem do filtro de anos/tipos saem das tabelas do cubo,
+# que já guardam quais valores ocorrem em cada (Ano, TipoPopulacao).
+#################################################################
+
+def construirCatalogo(df):
+    catalogo = {'Ano': (int(df['Ano'].min()), int(df['Ano'].max()))}
+    for dimensao in dados.COLUNAS_CATEGORICAS:
+        if dimensao in df.columns:
+            catalogo[dimensao] = valoresOrdenados(df[dimensao])
+    return catalogo
+
+
+def valoresOrdenados(valores):
+    if isinstance(valores.dtype, pd.CategoricalDtype):
+        # as categorias já vêm ordenadas; só descarta as que não ocorrem
+        return valores.cat.remove_unused_categories().cat.categories.tolist()
+    return sorted(valores.dropna().unique().tolist())
+
+
+def listaFiltrada(cubo, catalogo, dimensao, filtroAnos, filtroTP):
+    if dimensao not in cubo:
+        return catalogo[dimensao]
+
+    tabela = cubo[dimensao]
+    filtro = (tabela['Ano'] >= filtroAnos[0]) & (tabela['Ano'] <= filtroAnos[1]) & (tabela['TipoPopulacao'].isin(filtroTP))
+    return valoresOrdenados(tabela.loc[filtro, dimensao])
@@ -0,0 +1,85 @@
+#################################################################
+# Cubo de agregados
+#
+# Para cada dimensão, guarda a soma de Quantidade por (Ano, TipoPopulacao, dimensão).
+# As consultas filtram e reagrupam essas tabelas pequenas em vez das linhas originais,
+# então o custo não depende do número de linhas do CSV. As linhas são agregadas uma
+# vez por sentido, no nível mais detalhado da hierarquia geográfica (região UNHCR,
+# continente, sub-região e país); as tabelas de cada dimensão são reagrupadas dessa.
+#################################################################
+
+DIMENSOES_BASE = ['Ano', 'TipoPopulacao']
+
+DIMENSOES_CUBO = [
+    'NomePaisOrigem', 'SiglaPaisOrigem',
+    'RegiaoUNHCROrigem', 'RegiaoUNSDOrigem', 'SubRegiaoUNSDOrigem',
+    'NomePaisAsilo', 'SiglaPaisAsilo',
+    'RegiaoUNHCRAsilo', 'RegiaoUNSDAsilo', 'SubRegiaoUNSDAsilo',
+]
+
+MEDIDAS_CUBO = ['Quantidade', 'Linhas']
+
+SENTIDOS = ['Origem', 'Asilo']
+
+# colunas (sem o sufixo do sentido) da tabela mais detalhada de cada sentido,
+# guardada sob a chave 'Hierarquia<sentido>'
+COLUNAS_HIERARQUIA = ['RegiaoUNHCR', 'RegiaoUNSD', 'SubRegiaoUNSD', 'NomePais', 'SiglaPais']
+
+
+def agregarCubo(df, chaves, dropna=True):
+    return df.groupby(chaves, observed=True, dropna=dropna).agg(Quantidade=('Quantidade', 'sum'),
+                                                                Linhas=('Quantidade', 'size')).reset_index()
+
+
+def reagregar(tabela, chaves, dropna=True):
+    # soma das medidas de uma tabela já agregada, sem voltar às linhas
+    return tabela.groupby(chaves, observed=True, dropna=dropna)[MEDIDAS_CUBO].sum().reset_index()
+
+
+def sentidoDimensao(dimensao):
+    return next(sentido for sentido in SENTIDOS if dimensao.endswith(sentido))
+
+
+def construirCubo(df):
+    cubo = {}
+    for sentido in SENTIDOS:
+        colunas = [coluna + sentido for coluna in COLUNAS_HIERARQUIA if coluna + sentido in df.columns]
+        if colunas:
+            # valores ausentes são mantidos: a linha continua contando nas demais colunas
+            cubo['Hierarquia' + sentido] = agregarCubo(df, DIMENSOES_BASE + colunas, dropna=False)
+
+    # a tabela base (Ano, TipoPopulacao) fica sob a chave 'TipoPopulacao'
+    if cubo:
+        cubo['TipoPopulacao'] = reagregar(next(iter(cubo.values())), DIMENSOES_BASE)
+    else:
+        cubo['TipoPopulacao'] = agregarCubo(df, DIMENSOES_BASE)
+
+    for dimensao in DIMENSOES_CUBO:
+        if dimensao not in df.columns:
+            continue
+        cubo[dimensao] = reagregar(cubo['Hierarquia' + sentidoDimensao(dimensao)], DIMENSOES_BASE + [dimensao])
+
+    return cubo
+
+
+def tabelaCubo(cubo, por):
+    extras = [dimensao for dimensao in por if dimensao not in DIMENSOES_BASE]
+    if len(extras) > 1:
+        raise ValueError(f'O cubo agrega apenas uma dimensão além de Ano/TipoPopulacao: {extras}')
+
+    chave = extras[0] if extras else 'TipoPopulacao'
+    if chave not in cubo:
+        raise KeyError(f'Dimensão ausente no cubo: {chave}')
+    return cubo[chave]
+
+
+def consultarCubo(cubo, por, filtroAnos, filtroTP, filtros=None):
+    # Soma de Quantidade agrupada pelas colunas de `por`, restrita ao intervalo de anos,
+    # aos tipos de população e, opcionalmente, a valores permitidos por dimensão.
+    tabela = tabelaCubo(cubo, por)
+
+    filtro = (tabela['Ano'] >= filtroAnos[0]) & (tabela['Ano'] <= filtroAnos[1]) & (tabela['TipoPopulacao'].isin(filtroTP))
+    for dimensao, valores in (filtros or {}).items():
+        filtro &= tabela[dimensao].isin(valores)
+
+    return tabela[filtro].groupby(por, observed=True)[MEDIDAS_CUBO].sum().reset_index()
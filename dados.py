@@ -0,0 +1,639 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import requests
+
+
+#################################################################
+# Configuracoes
+#################################################################
+
+URL_DADOS = os.environ.get('DASHBOARD_URL_DADOS',
+                           "https://drive.google.com/uc?export=download&id=1S203NPfSJobD224bRnqlQhyD5WgkVrz5")
+DIR_DADOS = os.environ.get('DASHBOARD_DIR_DADOS', './dados/')
+ARQUIVO_DADOS = 'dados-processados.csv'
+ARQUIVO_ARROW = 'dados.arrow'
+DIR_PARTICOES = 'particoes'
+ARQUIVO_MANIFESTO = 'manifesto.json'
+ARQUIVO_TRAVA = '.trava'
+DIR_VERSOES = 'versoes'
+
+# tamanho dos blocos do download: limita a memória usada durante a atualização
+TAMANHO_BLOCO = 1024 * 1024
+
+# quantas versões extraídas manter (a atual e a anterior, ainda em uso por outros processos)
+VERSOES_MANTIDAS = 2
+
+# tempo (em segundos) que a cópia local é considerada atual antes de verificar a origem novamente
+TTL_DADOS = int(os.environ.get('DASHBOARD_TTL_DADOS', 24 * 60 * 60))
+
+# espera (em segundos) após uma atualização que falhou antes de tentar a origem de novo
+INTERVALO_TENTATIVAS = int(os.environ.get('DASHBOARD_INTERVALO_TENTATIVAS', 15 * 60))
+
+# com vários processos servindo o dashboard, um deles converte o CSV para Arrow IPC
+# e todos mapeiam o mesmo arquivo em memória em vez de manter cada um a sua cópia
+MEMORIA_COMPARTILHADA = os.environ.get('DASHBOARD_MEMORIA_COMPARTILHADA', '0') == '1'
+
+# esquema explícito do CSV: textos repetidos viram categorias e números são reduzidos
+COLUNAS_CATEGORICAS = [
+    'PaisOrigem', 'NomePaisOrigem', 'SiglaPaisOrigem',
+    'RegiaoUNHCROrigem', 'RegiaoUNSDOrigem', 'SubRegiaoUNSDOrigem', 'RegiaoSGDOrigem',
+    'PaisAsilo', 'NomePaisAsilo', 'SiglaPaisAsilo',
+    'RegiaoUNHCRAsilo', 'RegiaoUNSDAsilo', 'SubRegiaoUNSDAsilo', 'RegiaoSGDAsilo',
+    'TipoPopulacao',
+]
+COLUNAS_INTEIRAS = ['Ano', 'Quantidade']
+COLUNAS_DECIMAIS = ['LatitudeOrigem', 'LongitudeOrigem', 'LatitudeAsilo', 'LongitudeAsilo']
+
+# colunas que existem para os dois sentidos do fluxo (<coluna>Origem e <coluna>Asilo)
+COLUNAS_SENTIDO = ['Pais', 'NomePais', 'SiglaPais', 'RegiaoUNHCR', 'RegiaoUNSD', 'SubRegiaoUNSD', 'RegiaoSGD',
+                   'Latitude', 'Longitude']
+
+TIPOS_POPULACAO = ['ASY', 'OIP', 'REF', 'ROC']
+
+# colunas com estatísticas (mínimo e máximo) por partição no manifesto
+COLUNAS_ESTATISTICAS = COLUNAS_INTEIRAS + COLUNAS_DECIMAIS
+
+logger = logging.getLogger(__name__)
+
+_lockAtualizacao = threading.Lock()
+_atualizacaoEmAndamento = False
+
+
+#################################################################
+# Manifesto da cópia local
+#################################################################
+
+def caminhoVersao(versao):
+    return os.path.join(DIR_DADOS, DIR_VERSOES, versao)
+
+
+def caminhoDados(versao):
+    return os.path.join(caminhoVersao(versao), ARQUIVO_DADOS)
+
+
+def caminhoArrow(versao):
+    return os.path.join(caminhoVersao(versao), ARQUIVO_ARROW)
+
+
+def caminhoParticoes(versao):
+    return os.path.join(caminhoVersao(versao), DIR_PARTICOES)
+
+
+def caminhoManifesto():
+    return os.path.join(DIR_DADOS, ARQUIVO_MANIFESTO)
+
+
+def lerManifesto():
+    try:
+        with open(caminhoManifesto(), 'r', encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+
+def gravarManifesto(manifesto):
+    os.makedirs(DIR_DADOS, exist_ok=True)
+
+    # grava em arquivo temporário e substitui, para nunca deixar um manifesto pela metade
+    temporario = caminhoManifesto() + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, indent=2)
+    os.replace(temporario, caminhoManifesto())
+
+
+def copiaLocalValida(manifesto):
+    # versões geradas por atualização incremental têm só as partições, sem o CSV
+    return manifesto is not None and (os.path.exists(caminhoDados(manifesto['versao']))
+                                      or particoesDisponiveis(manifesto['versao']))
+
+
+def copiaLocalAtual(manifesto):
+    # verificada dentro do TTL, ou com uma tentativa de atualização que falhou há pouco:
+    # com a origem fora do ar, cada execução não dispara um novo download
+    agora = time.time()
+    return copiaLocalValida(manifesto) and (agora - manifesto.get('verificadoEm', 0) < TTL_DADOS
+                                            or agora - manifesto.get('tentativaEm', 0) < INTERVALO_TENTATIVAS)
+
+
+#################################################################
+# Trava entre processos
+#################################################################
+
+@contextlib.contextmanager
+def travaArquivo(bloquear=True):
+    # Garante que apenas um processo (ou thread) baixe os dados por vez.
+    # Com bloquear=False, retorna False imediatamente se outro já estiver baixando.
+    os.makedirs(DIR_DADOS, exist_ok=True)
+    with open(os.path.join(DIR_DADOS, ARQUIVO_TRAVA), 'a+b') as arquivo:
+        try:
+            if fcntl is not None:
+                fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX | (0 if bloquear else fcntl.LOCK_NB))
+            else:
+                arquivo.seek(0)
+                msvcrt.locking(arquivo.fileno(), msvcrt.LK_LOCK if bloquear else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            yield False
+            return
+
+        try:
+            yield True
+        finally:
+            if fcntl is not None:
+                fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+            else:
+                arquivo.seek(0)
+                msvcrt.locking(arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+#################################################################
+# Download
+#################################################################
+
+def baixarArquivo(response, destino):
+    # Grava o corpo da resposta em blocos, calculando o hash sem carregar tudo em memória
+    sha256 = hashlib.sha256()
+    with open(destino, 'wb') as file:
+        for bloco in response.iter_content(chunk_size=TAMANHO_BLOCO):
+            sha256.update(bloco)
+            file.write(bloco)
+    return sha256.hexdigest()
+
+
+def instalarVersao(arquivoZip, versao):
+    # Extrai em um diretório de preparação e o renomeia para o destino final.
+    # O rename é atômico: leitores nunca enxergam uma versão extraída pela metade.
+    destino = caminhoVersao(versao)
+    if os.path.exists(os.path.join(destino, ARQUIVO_DADOS)):
+        return
+
+    os.makedirs(os.path.join(DIR_DADOS, DIR_VERSOES), exist_ok=True)
+    preparacao = os.path.join(DIR_DADOS, DIR_VERSOES, f'.preparacao-{uuid.uuid4().hex}')
+    try:
+        with zipfile.ZipFile(arquivoZip, 'r') as zip_ref:
+            zip_ref.extractall(preparacao)
+        if os.path.exists(destino):
+            shutil.rmtree(destino)
+        os.rename(preparacao, destino)
+    finally:
+        shutil.rmtree(preparacao, ignore_errors=True)
+
+
+def removerVersoesAntigas(manter):
+    raiz = os.path.join(DIR_DADOS, DIR_VERSOES)
+    versoes = [os.path.join(raiz, nome) for nome in os.listdir(raiz) if not nome.startswith('.')]
+    versoes.sort(key=os.path.getmtime, reverse=True)
+    for posicao, caminho in enumerate(versoes):
+        if posicao >= VERSOES_MANTIDAS and os.path.basename(caminho) not in manter:
+            shutil.rmtree(caminho, ignore_errors=True)
+
+
+def downloadDadosZip(file_url, manifesto=None):
+    # Requisição condicional: a origem pode responder 304 se nada mudou
+    cabecalhos = {}
+    if copiaLocalValida(manifesto):
+        if manifesto.get('etag'):
+            cabecalhos['If-None-Match'] = manifesto['etag']
+        if manifesto.get('lastModified'):
+            cabecalhos['If-Modified-Since'] = manifesto['lastModified']
+
+    with requests.get(file_url, headers=cabecalhos, timeout=60, stream=True) as response:
+        if response.status_code == 304:
+            logger.info('Dados inalterados na origem (304), mantendo versão %s', manifesto['versao'])
+            return dict(manifesto, verificadoEm=time.time())
+
+        response.raise_for_status()
+
+        # Arquivo temporário com nome único: downloads simultâneos não se sobrescrevem
+        descritor, arquivoZip = tempfile.mkstemp(prefix='.download-', suffix='.zip', dir=DIR_DADOS)
+        os.close(descritor)
+        try:
+            sha256 = baixarArquivo(response, arquivoZip)
+
+            # Mesmo sem ETag, o hash do conteúdo evita extrair novamente um arquivo idêntico
+            if copiaLocalValida(manifesto) and manifesto.get('sha256') == sha256:
+                logger.info('Conteúdo idêntico à versão %s, extração ignorada', manifesto['versao'])
+                novoManifesto = dict(manifesto)
+            else:
+                novoManifesto = {'versao': sha256[:12], 'sha256': sha256, 'url': file_url}
+                instalarVersao(arquivoZip, novoManifesto['versao'])
+                logger.info('Nova versão dos dados extraída: %s', novoManifesto['versao'])
+        finally:
+            # Remover o arquivo ZIP após a extração
+            os.remove(arquivoZip)
+
+        novoManifesto['etag'] = response.headers.get('ETag')
+        novoManifesto['lastModified'] = response.headers.get('Last-Modified')
+
+    novoManifesto['verificadoEm'] = time.time()
+    return novoManifesto
+
+
+def atualizarDados(file_url=URL_DADOS, bloquear=True):
+    with travaArquivo(bloquear) as obtida:
+        # Quem esperou pela trava relê o manifesto: o outro processo pode já ter atualizado
+        manifesto = lerManifesto()
+        if not obtida or copiaLocalAtual(manifesto):
+            return manifesto
+
+        try:
+            novoManifesto = downloadDadosZip(file_url, manifesto)
+        except Exception:
+            # Sem cópia local não há o que servir: a falha precisa subir
+            if not copiaLocalValida(manifesto):
+                raise
+            logger.exception('Falha ao atualizar os dados, mantendo a versão %s; nova tentativa em %d s',
+                             manifesto['versao'], INTERVALO_TENTATIVAS)
+            manifesto = dict(manifesto, tentativaEm=time.time())
+            gravarManifesto(manifesto)
+            return manifesto
+
+        # a origem respondeu: a falha anterior, se houve, deixa de valer
+        novoManifesto.pop('tentativaEm', None)
+
+        # o arquivo compartilhado fica pronto antes de o manifesto apontar para a versão
+        if MEMORIA_COMPARTILHADA:
+            converterArrow(novoManifesto['versao'])
+
+        gravarManifesto(novoManifesto)
+        removerVersoesAntigas(manter={novoManifesto['versao']})
+        return novoManifesto
+
+
+def _atualizarEmSegundoPlano(file_url):
+    global _atualizacaoEmAndamento
+    try:
+        # em segundo plano não vale a pena esperar: se outro processo já está baixando, desiste
+        atualizarDados(file_url, bloquear=False)
+    finally:
+        with _lockAtualizacao:
+            _atualizacaoEmAndamento = False
+
+
+def agendarAtualizacao(file_url=URL_DADOS):
+    global _atualizacaoEmAndamento
+    with _lockAtualizacao:
+        if _atualizacaoEmAndamento:
+            return False
+        _atualizacaoEmAndamento = True
+
+    threading.Thread(target=_atualizarEmSegundoPlano, args=(file_url,),
+                     name='atualizacao-dados', daemon=True).start()
+    return True
+
+
+def garantirDados(file_url=URL_DADOS):
+    # Retorna o manifesto da cópia local que deve ser servida agora.
+    # Só espera pela rede quando não existe nenhuma cópia local.
+    manifesto = lerManifesto()
+    if not copiaLocalValida(manifesto):
+        return atualizarDados(file_url)
+
+    if not copiaLocalAtual(manifesto):
+        agendarAtualizacao(file_url)
+
+    return manifesto
+
+
+#################################################################
+# Leitura tipada
+#################################################################
+
+def lerCsvTipado(caminho):
+    # lê só o cabeçalho para aplicar o esquema apenas às colunas existentes
+    colunas = pd.read_csv(caminho, sep=";", nrows=0).columns
+
+    tipos = {coluna: 'category' for coluna in COLUNAS_CATEGORICAS if coluna in colunas}
+    tipos.update({coluna: 'float32' for coluna in COLUNAS_DECIMAIS if coluna in colunas})
+    df = pd.read_csv(caminho, sep=";", dtype=tipos)
+
+    # inteiros são reduzidos ao menor tipo que comporta os valores (somas continuam em 64 bits)
+    for coluna in COLUNAS_INTEIRAS:
+        if coluna in df.columns:
+            df[coluna] = pd.to_numeric(df[coluna], downcast='integer')
+
+    relatorio = relatorioMemoria(df)
+    logger.info('%s carregado: %d linhas, %.1f MB em memória', caminho, len(df), relatorio.loc['Total', 'Bytes'] / 1e6)
+    logger.debug('Memória por coluna:\n%s', relatorio)
+    return df
+
+
+def lerVersao(versao, anos=None, colunas=None):
+    # As partições (geradas por preprocessar.py) são lidas sem interpretar texto e
+    # só nos anos e colunas pedidos; sem elas, o CSV é lido e filtrado em memória.
+    if particoesDisponiveis(versao):
+        return lerParticoes(caminhoParticoes(versao), anos, colunas)
+
+    df = lerCsvTipado(caminhoDados(versao))
+    if anos is not None:
+        df = df[(df['Ano'] >= anos[0]) & (df['Ano'] <= anos[1])].reset_index(drop=True)
+    return df if colunas is None else df[list(colunas)]
+
+
+def relatorioMemoria(df):
+    relatorio = pd.DataFrame({
+        'Tipo': df.dtypes.astype(str),
+        'Bytes': df.memory_usage(index=False, deep=True),
+    })
+    relatorio.loc['Total'] = ['', relatorio['Bytes'].sum()]
+    return relatorio
+
+
+#################################################################
+# Arquivo compartilhado entre processos
+#
+# O CSV de uma versão é convertido uma única vez para Arrow IPC, sem compressão,
+# com as colunas categóricas como dicionários. Cada processo mapeia o arquivo em
+# memória e monta o DataFrame apontando para as páginas do arquivo: as páginas
+# ficam no cache do sistema e são compartilhadas, sem cópia por processo.
+#################################################################
+
+def tabelaArrow(df):
+    colunas = {}
+    for coluna in df.columns:
+        valores = df[coluna]
+        if pd.api.types.is_float_dtype(valores.dtype):
+            # NaN continua NaN (e não nulo): a coluna volta para o pandas sem cópia
+            colunas[coluna] = pa.array(valores.to_numpy(), from_pandas=False)
+        else:
+            colunas[coluna] = pa.array(valores)
+    return pa.table(colunas)
+
+
+def gravarArrow(df, caminho):
+    temporario = f'{caminho}.{uuid.uuid4().hex}.tmp'
+    try:
+        tabela = tabelaArrow(df)
+        with pa.OSFile(temporario, 'wb') as arquivo, pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+            # um único lote: cada coluna é um bloco contíguo no arquivo
+            escritor.write_table(tabela, max_chunksize=max(len(df), 1))
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def converterArrow(versao):
+    # Chamado com a trava de arquivo já obtida
+    caminho = caminhoArrow(versao)
+    if os.path.exists(caminho):
+        return caminho
+
+    df = lerVersao(versao)
+    # na ordem do índice (indice.construirIndice), que então usa as linhas como estão
+    df = df.sort_values(['TipoPopulacao', 'Ano'], kind='stable', ignore_index=True)
+    gravarArrow(df, caminho)
+    logger.info('Versão %s convertida para %s (%.1f MB)', versao, caminho, os.path.getsize(caminho) / 1e6)
+    return caminho
+
+
+def prepararArrow(versao):
+    # só um processo converte; os demais esperam pela trava e encontram o arquivo pronto
+    caminho = caminhoArrow(versao)
+    if not os.path.exists(caminho):
+        with travaArquivo():
+            converterArrow(versao)
+    return caminho
+
+
+def lerArrow(caminho):
+    # Sem cópia: cada coluna do DataFrame aponta para o arquivo mapeado, que continua
+    # válido enquanto o DataFrame existir, mesmo que a versão seja removida do disco.
+    # Colunas com nulos ainda são copiadas na conversão.
+    tabela = pa.ipc.open_file(pa.memory_map(caminho, 'r')).read_all()
+    df = tabela.to_pandas(split_blocks=True)
+    logger.info('%s mapeado: %d linhas', caminho, len(df))
+    return df
+
+
+def lerDadosCompartilhados(versao):
+    return lerArrow(prepararArrow(versao))
+
+
+#################################################################
+# Partições por ano
+#
+# preprocessar.py valida o CSV e grava um arquivo Parquet por Ano, com as colunas
+# categóricas codificadas como dicionário. O manifesto das partições guarda o
+# esquema, as categorias de cada coluna e o mínimo/máximo de cada partição, que
+# permitem ler só os anos e as colunas necessários.
+#################################################################
+
+def validarEsquema(df):
+    # Retorna a lista de problemas encontrados (vazia se o esquema é válido)
+    problemas = []
+
+    obrigatorias = COLUNAS_CATEGORICAS + COLUNAS_INTEIRAS + COLUNAS_DECIMAIS
+    faltando = [coluna for coluna in obrigatorias if coluna not in df.columns]
+    if faltando:
+        problemas.append(f'Colunas ausentes: {faltando}')
+
+    for coluna in COLUNAS_SENTIDO:
+        par = [coluna + sentido for sentido in ['Origem', 'Asilo']]
+        if sum(nome in df.columns for nome in par) == 1:
+            problemas.append(f'Par Origem/Asilo incompleto: {par}')
+
+    for coluna in COLUNAS_INTEIRAS:
+        if coluna in df.columns and not pd.api.types.is_integer_dtype(df[coluna].dtype):
+            problemas.append(f'{coluna} deveria ser inteiro (tipo {df[coluna].dtype}, {df[coluna].isna().sum()} nulos)')
+
+    if 'Quantidade' in df.columns and (df['Quantidade'] < 0).any():
+        problemas.append(f'Quantidade negativa em {(df["Quantidade"] < 0).sum()} linhas')
+
+    if 'TipoPopulacao' in df.columns:
+        invalidos = set(df['TipoPopulacao'].dropna().unique()) - set(TIPOS_POPULACAO)
+        if invalidos:
+            problemas.append(f'TipoPopulacao com códigos desconhecidos: {sorted(invalidos)}')
+        if df['TipoPopulacao'].isna().any():
+            problemas.append(f'TipoPopulacao nulo em {df["TipoPopulacao"].isna().sum()} linhas')
+
+    for sentido in ['Origem', 'Asilo']:
+        for coluna, limite in [('Latitude' + sentido, 90), ('Longitude' + sentido, 180)]:
+            if coluna in df.columns:
+                foraDoIntervalo = (df[coluna].abs() > limite).sum()
+                if foraDoIntervalo:
+                    problemas.append(f'{coluna} fora de [-{limite}, {limite}] em {foraDoIntervalo} linhas')
+
+    return problemas
+
+
+def estatisticasParticao(df):
+    estatisticas = {}
+    for coluna in COLUNAS_ESTATISTICAS:
+        if coluna in df.columns and df[coluna].notna().any():
+            estatisticas[coluna] = [df[coluna].min().item(), df[coluna].max().item()]
+    return estatisticas
+
+
+@contextlib.contextmanager
+def diretorioPreparado(destino):
+    # Entrega um diretório de preparação ao lado do destino e, se o bloco terminar
+    # sem erro, o renomeia para o destino: leitores nunca veem o conteúdo pela metade.
+    raiz = os.path.dirname(os.path.normpath(destino))
+    preparacao = os.path.join(raiz, f'.preparacao-{uuid.uuid4().hex}')
+    os.makedirs(preparacao)
+    try:
+        yield preparacao
+        if os.path.exists(destino):
+            shutil.rmtree(destino)
+        os.rename(preparacao, destino)
+    finally:
+        shutil.rmtree(preparacao, ignore_errors=True)
+
+
+def unirCategorias(*frames):
+    # Mesmas categorias (a união, ordenada) nas colunas categóricas de todos os
+    # DataFrames, para concatená-los sem converter as colunas para texto
+    tipos = {}
+    for df in frames:
+        for coluna in df.columns:
+            if isinstance(df[coluna].dtype, pd.CategoricalDtype):
+                tipos.setdefault(coluna, set()).update(df[coluna].cat.categories)
+    tipos = {coluna: pd.CategoricalDtype(sorted(categorias)) for coluna, categorias in tipos.items()}
+    return [df.astype({coluna: tipo for coluna, tipo in tipos.items() if coluna in df.columns}) for df in frames]
+
+
+def gravarParticao(particao, diretorio, ano):
+    arquivo = f'Ano={ano}.parquet'
+    # as categorias completas ficam no manifesto; cada arquivo guarda só as usadas
+    pq.write_table(pa.Table.from_pandas(particao, preserve_index=False),
+                   os.path.join(diretorio, arquivo), use_dictionary=True)
+    return {'arquivo': arquivo, 'linhas': len(particao), 'estatisticas': estatisticasParticao(particao)}
+
+
+def gravarManifestoParticoes(diretorio, colunas, categorias, particoes):
+    manifesto = {
+        'linhas': sum(particao['linhas'] for particao in particoes),
+        'colunas': colunas,
+        'categorias': categorias,
+        'particoes': sorted(particoes, key=lambda particao: particao['estatisticas']['Ano'][0]),
+    }
+    with open(os.path.join(diretorio, ARQUIVO_MANIFESTO), 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, indent=2, ensure_ascii=False)
+    return manifesto
+
+
+def validarOuFalhar(df):
+    problemas = validarEsquema(df)
+    if problemas:
+        raise ValueError('Esquema inválido:\n' + '\n'.join(problemas))
+
+
+def gravarParticoes(df, destino):
+    validarOuFalhar(df)
+    with diretorioPreparado(destino) as preparacao:
+        particoes = [gravarParticao(particao, preparacao, ano) for ano, particao in df.groupby('Ano', sort=True)]
+        return gravarManifestoParticoes(
+            preparacao,
+            {coluna: str(tipo) for coluna, tipo in df.dtypes.items()},
+            {coluna: df[coluna].cat.categories.tolist()
+             for coluna in df.columns if isinstance(df[coluna].dtype, pd.CategoricalDtype)},
+            particoes)
+
+
+def vincularArquivo(origem, destino):
+    # hard link: o arquivo da versão anterior é reaproveitado sem cópia
+    try:
+        os.link(origem, destino)
+    except OSError:
+        shutil.copy2(origem, destino)
+
+
+def atualizarParticoes(origem, destino, novos, modo='substituir'):
+    # Gera em `destino` as partições de `origem` com os anos de `novos` substituídos
+    # (modo 'substituir') ou acrescidos das novas linhas (modo 'acrescentar'). Só os
+    # anos afetados são regravados; os demais arquivos são vinculados. Retorna os anos.
+    validarOuFalhar(novos)
+    manifesto = lerManifestoParticoes(origem)
+    if set(novos.columns) != set(manifesto['colunas']):
+        raise ValueError(f'Colunas diferentes das partições atuais: {sorted(set(novos.columns) ^ set(manifesto["colunas"]))}')
+    novos = novos[list(manifesto['colunas'])]
+
+    anos = sorted(int(ano) for ano in novos['Ano'].unique())
+    particoes = {particao['estatisticas']['Ano'][0]: particao for particao in manifesto['particoes']}
+
+    colunas = dict(manifesto['colunas'])
+    categorias = {coluna: set(valores) for coluna, valores in manifesto['categorias'].items()}
+
+    with diretorioPreparado(destino) as preparacao:
+        for ano, particao in particoes.items():
+            if ano not in anos:
+                vincularArquivo(os.path.join(origem, particao['arquivo']), os.path.join(preparacao, particao['arquivo']))
+
+        for ano, particao in novos.groupby('Ano', sort=True):
+            if modo == 'acrescentar' and ano in particoes:
+                existentes = lerParticoes(origem, (ano, ano))
+                particao = pd.concat(unirCategorias(existentes, particao), ignore_index=True)
+            particoes[ano] = gravarParticao(particao, preparacao, ano)
+
+            for coluna in particao.columns:
+                if coluna in categorias:
+                    categorias[coluna].update(particao[coluna].cat.categories)
+                else:
+                    # inteiros maiores que os atuais ampliam o tipo da coluna
+                    colunas[coluna] = str(np.promote_types(colunas[coluna], particao[coluna].dtype))
+
+        gravarManifestoParticoes(preparacao, colunas,
+                                 {coluna: sorted(valores) for coluna, valores in categorias.items()},
+                                 list(particoes.values()))
+    return anos
+
+
+def lerManifestoParticoes(diretorio):
+    try:
+        with open(os.path.join(diretorio, ARQUIVO_MANIFESTO), 'r', encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+
+def particoesDisponiveis(versao):
+    return lerManifestoParticoes(caminhoParticoes(versao)) is not None
+
+
+def selecionarParticoes(manifesto, anos=None):
+    # partições cujo intervalo de Ano (pelas estatísticas) cruza o filtro
+    if anos is None:
+        return manifesto['particoes']
+    return [particao for particao in manifesto['particoes']
+            if particao['estatisticas']['Ano'][1] >= anos[0] and particao['estatisticas']['Ano'][0] <= anos[1]]
+
+
+def lerParticoes(diretorio, anos=None, colunas=None):
+    # Lê só as partições do intervalo de anos e só as colunas pedidas. As categorias
+    # vêm do manifesto: qualquer subconjunto de partições tem os mesmos tipos.
+    manifesto = lerManifestoParticoes(diretorio)
+    colunas = list(manifesto['colunas']) if colunas is None else list(colunas)
+    caminhos = [os.path.join(diretorio, particao['arquivo'])
+                for particao in selecionarParticoes(manifesto, anos)]
+
+    tabelas = [pq.read_table(caminho, columns=colunas) for caminho in caminhos]
+    # partições gravadas em momentos diferentes podem ter inteiros de tamanhos diferentes
+    df = pa.concat_tables(tabelas, promote_options='permissive').to_pandas() if tabelas else pd.DataFrame(columns=colunas)
+    for coluna in colunas:
+        tipo = manifesto['colunas'][coluna]
+        if coluna in manifesto['categorias']:
+            tipo = pd.CategoricalDtype(manifesto['categorias'][coluna])
+        df[coluna] = df[coluna].astype(tipo)
+
+    logger.info('%d partições de %s lidas: %d linhas, %d colunas', len(caminhos), diretorio, len(df), len(colunas))
+    return df
@@ -1,37 +1,29 @@
+import logging
+
 import streamlit as st
 import pandas as pd 
 import plotly as pl 
-import requests
-import zipfile
-import os
 import altair as alt
-import vega_datasets
 import plotly.graph_objects as go
+import carga
+import catalogo
+import cubo
+import graficos
+import dados
+import hierarquia
+import indice
+import mapa
+import perfil
+import ranking
+import sankey
+import tabela
 
 
 #################################################################
 # Funcoes
 #################################################################
 
-def debugger(objeto):
-    if _DEBUG_:
-        st.write(objeto)
-
-
-def downloadDadosZip(file_url):
-    arquivo = "temp"
-
-    # Fazer o download do arquivo
-    response = requests.get(file_url)
-    with open(arquivo, 'wb') as file:
-        file.write(response.content)
-
-    # Descompactar o arquivo ZIP
-    with zipfile.ZipFile(arquivo, 'r') as zip_ref:
-        zip_ref.extractall("./dados/")
-
-    # Remover o arquivo ZIP após a extração
-    os.remove(arquivo)
+logger = logging.getLogger('dashboard')
 
 def formataNumero(valor, prefixo = '', decimais = 2):
     for unidade in ['','mil']:
@@ -42,51 +34,40 @@ def formataNumero(valor, prefixo = '', decimais = 2):
     return f'{prefixo} {valor:.{decimais}f} milhões'
 
 
-@st.cache_data
-def lerDados():
-    downloadDadosZip("https://drive.google.com/uc?export=download&id=1S203NPfSJobD224bRnqlQhyD5WgkVrz5")
-    df = pd.read_csv("dados/dados-processados.csv", sep=";")
-    return df
+# geometria local servida em app/static/ (o navegador guarda em cache)
+def lerMapaMundi(nivel='médio'):
+    return alt.Data(url=mapa.urlMapa(nivel), format=alt.DataFormat(property='features', type='json'))
 
-@st.cache_data
-def lerMapaMundi():
-    return alt.topo_feature(vega_datasets.data.world_110m.url, 'countries')
+def listaFiltrada(versao, dimensao, filtroAnos, filtroTP):
+    return catalogo.listaFiltrada(carga.lerCubo(versao), carga.lerCatalogo(versao), dimensao, filtroAnos, filtroTP)
 
-@st.cache_data
-def listaTipoPopulacao(df):
-    return df['TipoPopulacao'].unique()
+def listaTipoPopulacao(versao):
+    return carga.lerCatalogo(versao)['TipoPopulacao']
 
-@st.cache_data
-def listaRegiaoUNHCR(df):
-    return df['RegiaoUNHCROrigem'].unique()
+# sentido: Origem | Asilo
+def listaRegiaoUNHCR(versao, filtroAnos, filtroTP, sentido='Origem'):
+    return listaFiltrada(versao, 'RegiaoUNHCR' + sentido, filtroAnos, filtroTP)
 
-@st.cache_data
-def listaRegiaoUNSD(df):
-    return df['RegiaoUNSDOrigem'].unique()
+def listaRegiaoUNSD(versao, filtroAnos, filtroTP, sentido='Origem'):
+    return listaFiltrada(versao, 'RegiaoUNSD' + sentido, filtroAnos, filtroTP)
 
-@st.cache_data
-def listaSubRegiaoUNSD(df):
-    return df['SubRegiaoUNSDOrigem'].unique()
+def listaSubRegiaoUNSD(versao, filtroAnos, filtroTP, sentido='Origem'):
+    return listaFiltrada(versao, 'SubRegiaoUNSD' + sentido, filtroAnos, filtroTP)
 
-@st.cache_data
-def listaRegiaoSGD(df):
-    return df['RegiaoSGDOrigem'].unique()
+def listaRegiaoSGD(versao):
+    return carga.lerCatalogo(versao)['RegiaoSGDOrigem']
 
-@st.cache_data
-def listaPais(df):
-    return df['PaisOrigem'].unique()
+def listaPais(versao):
+    return carga.lerCatalogo(versao)['PaisOrigem']
 
-@st.cache_data
-def listaIntervaloAno(df):
-    return df['Ano'].min(), df['Ano'].max()
+def listaIntervaloAno(versao):
+    return carga.lerCatalogo(versao)['Ano']
 
-@st.cache_data
-def listaPaisesOrigem(df):
-    return df['NomePaisOrigem'].unique()
+def listaPaisesOrigem(versao, filtroAnos, filtroTP):
+    return listaFiltrada(versao, 'NomePaisOrigem', filtroAnos, filtroTP)
 
-@st.cache_data
-def listaPaisesAsilo(df):
-    return df['NomePaisAsilo'].unique()
+def listaPaisesAsilo(versao, filtroAnos, filtroTP):
+    return listaFiltrada(versao, 'NomePaisAsilo', filtroAnos, filtroTP)
 
 
 def formataTP(opcao):
@@ -101,41 +82,43 @@ def formataTP(opcao):
     else:
         return 'Desconhecido'
     
-def filtroAnoTipoPopulacao(df, filtroAnos, filtroTP):
-    filtro = (df['Ano'] >= filtroAnos[0]) & (df['Ano'] <= filtroAnos[1]) & (df['TipoPopulacao'].isin(filtroTP))
-    return df[filtro]
+def filtroAnoTipoPopulacao(indiceDados, filtroAnos, filtroTP):
+    return indice.filtrarIndice(indiceDados, filtroAnos, filtroTP)
 
 
 ############################
 # filtros para o sidebar
 ############################
     
-def addFiltroAnos(df):
+def addFiltroAnos(versao):
     todosAnos = st.sidebar.toggle("Dados de todo o período", value = True)
-    anoMin, anoMax = listaIntervaloAno(df)
+    anoMin, anoMax = listaIntervaloAno(versao)
     if todosAnos:
         selecao = (anoMin, anoMax)
     else:
         selecao = st.sidebar.slider('**Ano**', anoMin, anoMax, value = (anoMin, anoMax))
-    debugger(f'Intervalo anos: {selecao}')
+    perfil.anotar('filtroAnos', selecao)
     return selecao
 
 def addFiltroFluxo():
     st.sidebar.divider()
     selecao = st.sidebar.radio('**Sumarizar por**',['Origem','Asilo'])
-    debugger(f'Sumarizar por: {selecao}')
+    perfil.anotar('filtroFluxo', selecao)
     return selecao
 
 
-def addFiltroTipoPopulacao(df):
+def addFiltroTipoPopulacao(versao):
     st.sidebar.divider()
-    lista = listaTipoPopulacao(df)
+    lista = listaTipoPopulacao(versao)
     selecao = st.sidebar.multiselect('**Tipo de população**',
                                     lista, 
                                     default=lista,                                  
                                     format_func=formataTP,
                                     placeholder='Selecione as opções...')
-    debugger(f'MTPSelected: {selecao}')    
+    # na ordem do catálogo, qualquer que seja a ordem dos cliques: a mesma seleção
+    # usa as mesmas entradas de cache (e as do aquecimento)
+    selecao = [tipo for tipo in lista if tipo in selecao]
+    perfil.anotar('filtroTP', selecao)
     return selecao
 
 
@@ -143,6 +126,44 @@ def addFiltroTipoPopulacao(df):
 # Graficos
 ############
 
+# Compacta os dados do gráfico (recusando linhas brutas acima de LIMITE_LINHAS) e,
+# com o painel de desempenho ou o arquivo de perfil ativos, registra o tamanho
+# enviado ao navegador: a medição serializa o gráfico uma segunda vez.
+# Gráficos com o mesmo hash da execução anterior não trafegam de novo: o Streamlit
+# envia apenas uma referência para mensagens grandes que o navegador já tem.
+def exibirGrafico(chart, chave, **kwargs):
+    with perfil.etapa('serialização'):
+        chart = graficos.compactarGrafico(chart)
+
+    if _MEDIR_PAYLOAD_:
+        with perfil.etapa('serialização'):
+            assinatura, tamanho = graficos.medirGrafico(chart)
+        anteriores = st.session_state.setdefault('payloadGraficos', {})
+        alterado = anteriores.get(chave, (None,))[0] != assinatura
+        anteriores[chave] = (assinatura, tamanho, alterado)
+        fragmento = st.session_state.get('payloadFragmento', 'script')
+        st.session_state.setdefault('payloadExecucao', {}).setdefault(fragmento, []).append(chave)
+
+    with perfil.etapa('envio'):
+        st.altair_chart(chart, **kwargs)
+    return chart
+
+def iniciarPayloadFragmento(fragmento):
+    # cada fragmento guarda os gráficos que enviou: a reexecução só do fragmento
+    # substitui a lista dele, sem somar de novo os gráficos já contados
+    st.session_state.setdefault('payloadExecucao', {})[fragmento] = []
+    st.session_state['payloadFragmento'] = fragmento
+
+def relatorioPayload():
+    payload = st.session_state.get('payloadGraficos', {})
+    execucao = [chave for chaves in st.session_state.get('payloadExecucao', {}).values() for chave in chaves]
+    relatorio = pd.DataFrame([(chave,) + payload[chave][1:] for chave in execucao],
+                             columns=['Gráfico', 'Bytes', 'Alterado'])
+    logger.info('Gráficos nesta execução: %d bytes (%d alterados)',
+                relatorio['Bytes'].sum(), relatorio.loc[relatorio['Alterado'], 'Bytes'].sum())
+    return relatorio
+
+@perfil.medirEtapa
 def refugiadosPorTipo(df):
     descriptions = {
         'ASY': 'ASY - Em busca de asilo',
@@ -151,7 +172,7 @@ def refugiadosPorTipo(df):
         'ROC': 'ROC - Análogo a refugiados'
     }
 
-    df_summed = df.groupby('TipoPopulacao')['Quantidade'].sum().reset_index()
+    df_summed = df.groupby('TipoPopulacao', observed=True)['Quantidade'].sum().reset_index()
     df_summed['Descricao'] = df_summed['TipoPopulacao'].map(descriptions)
 
 
@@ -160,61 +181,67 @@ def refugiadosPorTipo(df):
         x=alt.X('TipoPopulacao:N', title='Tipo'),
         y=alt.Y('Quantidade:Q', scale=alt.Scale(type='linear', base=10), title='Quantidade'),
         color=alt.Color('Descricao:N', legend=alt.Legend(title="Tipo")),
-        tooltip=['TipoPopulacao', 'Quantidade']
+        tooltip=['TipoPopulacao:N', 'Quantidade:Q']
     ).properties(
         width=710,
         height=400,
         title='Quantidade de refugiados por tipo'
     )
-    st.altair_chart(chart, use_container_width=False)
+    return exibirGrafico(chart, 'Quantidade de refugiados por tipo', use_container_width=False)
 
+@perfil.medirEtapa
 def refugiadosPorAno(df):
     df_acum_ano = df.groupby('Ano')['Quantidade'].sum().reset_index()
     chart = alt.Chart(df_acum_ano).mark_bar().encode(
         x=alt.X('Ano:O', bin=alt.Bin(maxbins=40), title='Anos'),
         y=alt.Y('Quantidade:Q', scale=alt.Scale(type='linear', base=10), title='Quantidade de refugiados'),
         color=alt.Color('Ano:O', scale=alt.Scale(scheme='category20'), legend=None),
-        tooltip=['Ano', 'Quantidade']
+        tooltip=['Ano:O', 'Quantidade:Q']
     ).properties(
         width=1020,
         height=600,
         title='Quantidade de refugiados por ano'
     )
-    st.altair_chart(chart, use_container_width=False)
+    return exibirGrafico(chart, 'Quantidade de refugiados por ano', use_container_width=False)
 
+@perfil.medirEtapa
 def refugiadosPorRegiao(df, regiao, tit_x='Região', tit_chart='Refugiados por região'):
-    df_summed = df.groupby(regiao)['Quantidade'].sum().reset_index()
+    df_summed = df.groupby(regiao, observed=True)['Quantidade'].sum().reset_index()
     chart = alt.Chart(df_summed).mark_bar().encode(
         x=alt.X(f'{regiao}:O', title=tit_x),
         y=alt.Y('Quantidade:Q', scale=alt.Scale(type='linear', base=10), title='Número de refugiados'),
         color=alt.Color(f'{regiao}:N', legend=alt.Legend(title="Regiões")),
-        tooltip=[regiao, 'Quantidade']
+        tooltip=[f'{regiao}:N', 'Quantidade:Q']
     ).properties(
         width=1020,
         height=600,
         title=tit_chart
     )
-    st.altair_chart(chart, use_container_width=False)
+    return exibirGrafico(chart, tit_chart, use_container_width=False)
 
+@perfil.medirEtapa
 def refugiadosPorAnoRegiao(df, regiao, tit_chart='Refugiados por ano e região'):
-    df_regiao = df.groupby(['Ano', regiao])['Quantidade'].sum().reset_index()
+    df_regiao = df.groupby(['Ano', regiao], observed=True)['Quantidade'].sum().reset_index()
 
     chart = alt.Chart(df_regiao).mark_bar().encode(
         x=alt.X('Ano:O', title='Ano'),
         y=alt.Y('Quantidade:Q', title='Quantidade de refugiados'),
         color=alt.Color(f'{regiao}:N', title='Regiões'),
-        tooltip=['Ano', regiao, 'Quantidade']
+        tooltip=['Ano:O', f'{regiao}:N', 'Quantidade:Q']
     ).properties(
         width=1280,
         height=700,
         title=tit_chart
     )
-    st.altair_chart(chart, use_container_width=False)
+    return exibirGrafico(chart, tit_chart, use_container_width=False)
 
 # sentido: Origem | Destino
+# df: totais por país (cubo.consultarCubo)
+@perfil.medirEtapa
 def topNRefugiados(df, topn, sentido, tit_chart):
     pais = 'NomePais' + sentido
-    top_paises = df.groupby(pais)['Quantidade'].sum().reset_index().sort_values('Quantidade', ascending=False).head(topn)
+    # seleção parcial dos topn maiores, sem ordenar todos os países
+    top_paises = df.nlargest(topn, 'Quantidade')[[pais, 'Quantidade']]
 
     # Criando o gráfico de barras em Altair
     chart = alt.Chart(top_paises).mark_bar().encode(
@@ -228,15 +255,17 @@ def topNRefugiados(df, topn, sentido, tit_chart):
         height=400,
         title=tit_chart
     )
-    st.altair_chart(chart, use_container_width=False)
+    return exibirGrafico(chart, tit_chart, use_container_width=False)
 
 
 # sentido: Origem | Destino
+# df: totais por país já unidos às coordenadas (mapa.pontosMapa)
+@perfil.medirEtapa
 def refugiadosMapaMundi(df, countries, sentido, tit_chart):   
     pais = 'NomePais' + sentido
     latitude = 'Latitude' + sentido
     longitude = 'Longitude' + sentido
-    df_paises = df.groupby(pais).agg({'Quantidade': 'sum', latitude: 'min', longitude: 'min'}).reset_index()
+    df_paises = df[[pais, 'Quantidade', latitude, longitude]]
 
     chart = alt.Chart(df_paises).mark_circle(stroke="black").encode(
         longitude=f'{longitude}:Q',
@@ -259,51 +288,21 @@ def refugiadosMapaMundi(df, countries, sentido, tit_chart):
         height=700
     )
 
-    st.altair_chart((background + chart).project(scale=200), use_container_width=True)
-
+    return exibirGrafico((background + chart).project(scale=200), tit_chart, use_container_width=True)
 
 
-# sentido: Origem | Destino
-def agruparOutrosPaises(df, origem, asilo, topn = None):
 
-    # Ordenar o DataFrame por 'Quantidade' em ordem decrescente
-    aggregated_df = df.groupby(['NomePaisOrigem', 'NomePaisAsilo']).agg({'Quantidade': 'sum'}).reset_index().sort_values(by='Quantidade', ascending=False)
-
-    if topn == None:
-        return aggregated_df
-    else:
-        # Separar os topn registros
-        top_df = aggregated_df.head(topn)
-
-        # Agregar os demais registros
-        others_df = aggregated_df.iloc[topn:]
-
-        # Se há registros em others_df, agregue-os
-        if not others_df.empty:
-            nomePaisGrupo = 'NomePais' + origem
-            nomePaisOutros = 'NomePais' + asilo
-            others_aggregated = others_df.groupby([nomePaisGrupo]).agg({'Quantidade': 'sum'}).reset_index()
-            others_aggregated[nomePaisOutros] = 'Outros'
-            # Concatenar os topn registros com os agregados 'Outros'
-            final_df = pd.concat([top_df, others_aggregated]).sort_values(by='Quantidade', ascending=False)
-        else:
-            final_df = top_df
-
-        return final_df
+# sentido: Origem | Asilo (os demais pares de cada país desse sentido viram "Outros")
+@perfil.medirEtapa
+def agruparOutrosPaises(rankingDados, sentido, topn = None):
+    return ranking.topPares(rankingDados[(sentido, False)], topn)
 
 
+@perfil.medirEtapa
 def refugiadosPorPais(df):
 
-    # Criando listas de labels únicas para os nós
-    all_countries = pd.concat([df['NomePaisOrigem'], df['NomePaisAsilo']]).unique()
-
-    # Mapeando países a índices
-    country_idx = {country: idx for idx, country in enumerate(all_countries)}
-
-    # Criando os dados de origem, destino e quantidades para o gráfico de Sankey
-    source = [country_idx[src] for src in df['NomePaisOrigem']]
-    target = [country_idx[dst] for dst in df['NomePaisAsilo']]
-    values = df['Quantidade'].tolist()
+    # Criando os nós e os dados de origem, destino e quantidades para o gráfico de Sankey
+    all_countries, arestas = sankey.construirArestasSankey(df, ['NomePaisOrigem', 'NomePaisAsilo'])
 
     fig = go.Figure(data=[go.Sankey(
         arrangement='snap',
@@ -311,13 +310,13 @@ def refugiadosPorPais(df):
             pad=30,
             thickness=20,
             line=dict(color="black", width=1.0),
-            label=list(all_countries)
+            label=all_countries
         ),
         link=dict(
             arrowlen=30,
-            source=source,  # Índices dos países de origem
-            target=target,  # Índices dos países destino
-            value=values,  # Quantidade de movimentação
+            source=arestas['source'],  # Índices dos países de origem
+            target=arestas['target'],  # Índices dos países destino
+            value=arestas['value'],  # Quantidade de movimentação
             color='#EEEEEE' #F2EFE5'#F5EFE6' #F2EFE5'#'#EFEFEF'#'#F1F1F1'#'#EADBC8'
         ))])
 
@@ -326,54 +325,23 @@ def refugiadosPorPais(df):
                       font=dict(size = 20),
                       height=768)
 
-    
-    st.plotly_chart(fig, use_container_width=True)
 
+    with perfil.etapa('envio'):
+        st.plotly_chart(fig, use_container_width=True)
+    return fig
 
-def agruparOutrosPaisesTipoPopulacao(df, origem, asilo, topn = None):
-
-    # Ordenar o DataFrame por 'Quantidade' em ordem decrescente
-    aggregated_df = df.groupby(['NomePaisOrigem', 'TipoPopulacao', 'NomePaisAsilo']).agg({'Quantidade': 'sum'}).reset_index().sort_values(by='Quantidade', ascending=False)
-
-    if topn == None:
-        return aggregated_df
-    else:
-        # Separar os topn registros
-        top_df = aggregated_df.head(topn)
-
-        # Agregar os demais registros
-        others_df = aggregated_df.iloc[topn:]
-
-        # Se há registros em others_df, agregue-os
-        if not others_df.empty:
-            nomePaisGrupo = 'NomePais' + origem
-            nomePaisOutros = 'NomePais' + asilo
-            others_aggregated = others_df.groupby([nomePaisGrupo,'TipoPopulacao']).agg({'Quantidade': 'sum'}).reset_index()
-            others_aggregated[nomePaisOutros] = 'Outros'
-            # Concatenar os topn registros com os agregados 'Outros'
-            final_df = pd.concat([top_df, others_aggregated]).sort_values(by='Quantidade', ascending=False)
-        else:
-            final_df = top_df
 
-        return final_df
+# sentido: Origem | Asilo; os parceiros do país (por tipo de população) além dos
+# topn maiores viram "Outros"
+@perfil.medirEtapa
+def agruparOutrosPaisesTipoPopulacao(rankingDados, sentido, pais, topn = None):
+    return ranking.topParceiros(rankingDados[(sentido, True)], pais, topn)
 
 
+@perfil.medirEtapa
 def refugiadosPorPaisTipoPopulacao(df):
-    unique_nodes = pd.concat([df['NomePaisOrigem'], df['TipoPopulacao'], df['NomePaisAsilo']]).unique()
-    node_dict = {node: i for i, node in enumerate(unique_nodes)}
-
-    source = []
-    target = []
-    values = []
-
-    for _, row in df.iterrows():
-        source.append(node_dict[row['NomePaisOrigem']])
-        target.append(node_dict[row['TipoPopulacao']])
-        values.append(row['Quantidade'])
-
-        source.append(node_dict[row['TipoPopulacao']])
-        target.append(node_dict[row['NomePaisAsilo']])
-        values.append(row['Quantidade'])   
+    # origem -> tipo de população -> asilo
+    unique_nodes, arestas = sankey.construirArestasSankey(df, ['NomePaisOrigem', 'TipoPopulacao', 'NomePaisAsilo'])
 
     fig = go.Figure(data=[go.Sankey(
         arrangement='snap',
@@ -381,13 +349,13 @@ def refugiadosPorPaisTipoPopulacao(df):
             pad=30,
             thickness=20,
             line=dict(color="black", width=1.0),
-            label=list(unique_nodes)
+            label=unique_nodes
         ),
         link=dict(
             arrowlen=30,
-            source=source,  # Índices dos países de origem
-            target=target,  # Índices dos países destino
-            value=values,  # Quantidade de movimentação
+            source=arestas['source'],  # Índices dos países de origem
+            target=arestas['target'],  # Índices dos países destino
+            value=arestas['value'],  # Quantidade de movimentação
             color='#EEEEEE'
         ))])
 
@@ -396,149 +364,266 @@ def refugiadosPorPaisTipoPopulacao(df):
                       font=dict(size = 20),
                       height=768)
 
-    
-    st.plotly_chart(fig, use_container_width=True)
+
+    with perfil.etapa('envio'):
+        st.plotly_chart(fig, use_container_width=True)
+    return fig
 
 
 
 
 #################################################################
-# Principal
+# Abas
+#
+# Cada aba é um fragmento: os widgets de uma aba reexecutam apenas ela,
+# sem recalcular o restante da página.
 #################################################################
 
-# habilitar visualização de variáveis na tela
-_DEBUG_ = False
-
-# configuracoes do streamlit
-st.set_page_config(layout='wide', 
-                   page_title='Dashboard - Refugiados',
-                   page_icon=':earth_africa:')
-
-#configuracoes do altair
-alt.data_transformers.disable_max_rows()
-
-# https://streamlit-emoji-shortcodes-streamlit-app-gwckff.streamlit.app/
-st.title("REFUGIADOS NO MUNDO :earth_africa:")
-
-df = lerDados()
-
-countries = lerMapaMundi()
-
-st.sidebar.title('Filtros')
-
-filtroAnos = addFiltroAnos(df)
-filtroFluxo = addFiltroFluxo()
-filtroTP = addFiltroTipoPopulacao(df)
-
-df_filtrado = filtroAnoTipoPopulacao(df, filtroAnos, filtroTP)
-
-abaGeral, abaUNHCR, abaUNSD, abaSubUNSD, abaMapa, abaOrigemAsilo = st.tabs(['Geral','Regiões das Nações Unidas','Continentes','Sub Regiões','Mapa Mundi', 'Fluxo Origem/Asilo'])
-
-with abaGeral:
+def indiceSelecao(opcoes, valor):
+    return None if valor is None else list(opcoes).index(valor)
+
+def lembrarSelecao(chave, valor):
+    # widgets de abas ocultas perdem o estado; a última seleção é guardada à parte
+    st.session_state['selecao' + chave] = valor
+    return valor
+
+def selecaoLembrada(chave, opcoes, padrao):
+    selecao = st.session_state.get('selecao' + chave, padrao)
+    if isinstance(selecao, list):
+        return [valor for valor in selecao if valor in opcoes]
+    return selecao if selecao in opcoes else padrao
+
+@st.fragment
+@perfil.perfilado
+def exibirAbaGeral(versao, indiceDados, filtroAnos, filtroTP, filtroFluxo):
+    iniciarPayloadFragmento('abaGeral')
+    consultas = carga.lerConsultasAbaGeral(versao, filtroAnos, filtroTP, filtroFluxo)
     c1, c2 = st.columns(2)
     with c1:
-        st.metric("Total de refugiados", formataNumero(df_filtrado['Quantidade'].sum()))    
-        refugiadosPorTipo(df_filtrado)
+        df_tipo = consultas['tipo']
+        st.metric("Total de refugiados", formataNumero(df_tipo['Quantidade'].sum()))    
+        refugiadosPorTipo(df_tipo)
     with c2:        
         tituloGeral = 'Países de ' + filtroFluxo
-        campoGeral = 'SiglaPais' + filtroFluxo
-        st.metric(tituloGeral, formataNumero(df_filtrado[campoGeral].nunique(), decimais=0))
-        topNRefugiados(df_filtrado, 10, filtroFluxo, 'Top 10 países de ' + filtroFluxo.lower() + ' de refugiados')
+        st.metric(tituloGeral, formataNumero(len(consultas['siglas']), decimais=0))
+        df_paises = consultas['paises']
+        topNRefugiados(df_paises, 10, filtroFluxo, 'Top 10 países de ' + filtroFluxo.lower() + ' de refugiados')
 
     
-    refugiadosPorAno(df_filtrado)
-    st.dataframe(df_filtrado)
-    
-
-with abaUNHCR:
-    with st.expander('**Filtro de Regiões**'):
-        filtroUNHCR = st.multiselect('Regiões',
-                            listaRegiaoUNHCR(df_filtrado), 
-                            default=listaRegiaoUNHCR(df_filtrado),                                  
+    refugiadosPorAno(consultas['ano'])
+
+    # só a tabela usa as linhas do filtro: com a aba oculta o recorte não é feito
+    with perfil.etapa('filtro'):
+        df_filtrado = filtroAnoTipoPopulacao(indiceDados, filtroAnos, filtroTP)
+    tabelaPaginada(df_filtrado, 'tabelaGeral')
+
+# busca, ordenação e paginação no servidor: só a página visível vai para o navegador
+@st.fragment
+@perfil.perfilado
+def tabelaPaginada(df, chave, tamanhos=(25, 50, 100, 500)):
+    c1, c2, c3, c4 = st.columns(4)
+    colunaOrdem = c1.selectbox('Ordenar por', [None] + list(df.columns),
+                               format_func=lambda coluna: 'Ordem original' if coluna is None else coluna,
+                               key=chave + 'Ordem')
+    crescente = c2.radio('Sentido', ['Crescente', 'Decrescente'], horizontal=True, key=chave + 'Sentido') == 'Crescente'
+    colunaBusca = c3.selectbox('Buscar em', tabela.colunasTexto(df), key=chave + 'ColunaBusca')
+    texto = c4.text_input('Contém', key=chave + 'Busca')
+
+    df_tabela = tabela.filtrarTabela(df, colunaBusca, texto)
+    ordem = tabela.ordenarTabela(df_tabela, colunaOrdem, crescente)
+
+    p1, p2, p3 = st.columns([1, 1, 4])
+    tamanho = p1.selectbox('Linhas por página', tamanhos, key=chave + 'Tamanho')
+    paginas = tabela.totalPaginas(len(df_tabela), tamanho)
+    if st.session_state.get(chave + 'Pagina', 1) > paginas:
+        st.session_state[chave + 'Pagina'] = paginas
+    pagina = p2.number_input('Página', min_value=1, max_value=paginas, step=1, key=chave + 'Pagina')
+    p3.caption(f'{len(df_tabela):,} linhas · página {pagina} de {paginas}'.replace(',', '.'))
+
+    st.dataframe(tabela.paginaTabela(df_tabela, ordem, pagina, tamanho))
+
+    e1, e2 = st.columns([1, 5])
+    formato = e1.radio('Formato', ['csv', 'parquet'], horizontal=True, key=chave + 'Formato')
+    # a exportação só é gerada quando o botão é clicado
+    e2.download_button('Exportar', data=lambda: tabela.exportarTabela(df_tabela, ordem, formato),
+                       file_name=f'refugiados.{formato}', key=chave + 'Exportar')
+
+# campo: RegiaoUNHCR | RegiaoUNSD | SubRegiaoUNSD
+@st.fragment
+@perfil.perfilado
+def exibirAbaRegiao(versao, filtroAnos, filtroTP, filtroFluxo, campo, listaRegioes, nome, titulo):
+    iniciarPayloadFragmento('aba' + campo)
+    with st.expander(f'**Filtro de {titulo}**'):
+        lista = listaRegioes(versao, filtroAnos, filtroTP, filtroFluxo)
+        filtroRegioes = st.multiselect(titulo,
+                            lista, 
+                            default=selecaoLembrada(campo, lista, list(lista)),                                  
                             placeholder='Selecione as opções...')
+        lembrarSelecao(campo, filtroRegioes)
+
+    regiao = campo + filtroFluxo
+    consultas = carga.lerConsultasAbaRegiao(versao, filtroAnos, filtroTP, regiao, filtroRegioes)
+    refugiadosPorRegiao(consultas['regiao'], regiao, f'{nome.capitalize()} de {filtroFluxo.lower()}', f'Refugiados por {nome} de {filtroFluxo.lower()}')
+    refugiadosPorAnoRegiao(consultas['anoRegiao'], regiao, f'Refugiados por ano e {nome} de {filtroFluxo.lower()}')
+
+    # detalhamento de uma região nos níveis abaixo dela, a partir da hierarquia já
+    # montada para o filtro (a mesma das consultas acima)
+    with st.expander(f'**Detalhar {nome}**'):
+        valor = st.selectbox(titulo,
+                            filtroRegioes,
+                            index=indiceSelecao(filtroRegioes, selecaoLembrada('Detalhe' + campo, filtroRegioes, None)),
+                            placeholder='Selecione uma opção...')
+        lembrarSelecao('Detalhe' + campo, valor)
+    if valor is None:
+        return
+    detalhes = hierarquia.detalharValor(carga.lerHierarquia(versao, filtroAnos, filtroTP), regiao, valor)
+    for coluna, df_detalhe in detalhes.items():
+        if coluna == 'NomePais' + filtroFluxo:
+            topNRefugiados(df_detalhe, 20, filtroFluxo, f'Top 20 países de {filtroFluxo.lower()} em {valor}')
+        else:
+            refugiadosPorRegiao(df_detalhe, coluna, f'Sub-região de {filtroFluxo.lower()}',
+                                f'Refugiados por sub-região de {filtroFluxo.lower()} em {valor}')
+
+@st.fragment
+@perfil.perfilado
+def exibirAbaMapa(versao, cuboDados, filtroAnos, filtroTP, filtroFluxo):
+    iniciarPayloadFragmento('abaMapa')
+    nivel = st.select_slider('Detalhe do mapa', options=list(mapa.NIVEIS_MAPA), value='médio', key='nivelMapa')
+    countries = lerMapaMundi(nivel)
+    df_paises = mapa.pontosMapa(cubo.consultarCubo(cuboDados, ['NomePais' + filtroFluxo], filtroAnos, filtroTP),
+                                carga.lerCentroides(versao)[filtroFluxo])
 
     if filtroFluxo == 'Origem':
-        df_filtrado_origem = df_filtrado[df_filtrado['RegiaoUNHCROrigem'].isin(filtroUNHCR)]
-        refugiadosPorRegiao(df_filtrado_origem, 'RegiaoUNHCROrigem', 'Região de origem', 'Refugiados por região de origem')
-        refugiadosPorAnoRegiao(df_filtrado_origem, 'RegiaoUNHCROrigem', 'Refugiados por ano e região de origem')
-    else:
-        df_filtrado_asilo  = df_filtrado[df_filtrado['RegiaoUNHCRAsilo'].isin(filtroUNHCR)]
-        refugiadosPorRegiao(df_filtrado_asilo, 'RegiaoUNHCRAsilo', 'Região de asilo', 'Refugiados por região de asilo')
-        refugiadosPorAnoRegiao(df_filtrado_asilo, 'RegiaoUNHCRAsilo', 'Refugiados por ano e região de asilo')
-
-with abaUNSD:
-    with st.expander('**Filtro de Continentes**'):
-        filtroUNSD = st.multiselect('Continentes',
-                            listaRegiaoUNSD(df_filtrado), 
-                            default=listaRegiaoUNSD(df_filtrado),                                  
-                            placeholder='Selecione as opções...')
-
-    if filtroFluxo == 'Origem':
-        df_filtrado_origem = df_filtrado[df_filtrado['RegiaoUNSDOrigem'].isin(filtroUNSD)]
-        refugiadosPorRegiao(df_filtrado_origem, 'RegiaoUNSDOrigem', 'Continente de origem', 'Refugiados por continente de origem')
-        refugiadosPorAnoRegiao(df_filtrado_origem, 'RegiaoUNSDOrigem', 'Refugiados por ano e continente de origem')
-    else:
-        df_filtrado_asilo = df_filtrado[df_filtrado['RegiaoUNSDAsilo'].isin(filtroUNSD)]
-        refugiadosPorRegiao(df_filtrado_asilo, 'RegiaoUNSDAsilo', 'Continente de asilo', 'Refugiados por continente de asilo')
-        refugiadosPorAnoRegiao(df_filtrado_asilo, 'RegiaoUNSDAsilo', 'Refugiados por ano e continente de asilo')
-
-with abaSubUNSD:
-    with st.expander('**Filtro de Sub-regiões**'):
-        filtroSubRegioes = st.multiselect('Sub-regiões',
-                            listaSubRegiaoUNSD(df_filtrado), 
-                            default=listaSubRegiaoUNSD(df_filtrado),                                  
-                            placeholder='Selecione as opções...')
-        
-    if filtroFluxo == 'Origem':        
-        df_filtrado_origem = df_filtrado[df_filtrado['SubRegiaoUNSDOrigem'].isin(filtroSubRegioes)]
-        refugiadosPorRegiao(df_filtrado_origem, 'SubRegiaoUNSDOrigem', 'Sub-região de origem', 'Refugiados por sub-região de origem')
-        refugiadosPorAnoRegiao(df_filtrado_origem, 'SubRegiaoUNSDOrigem', 'Refugiados por ano e sub-região de origem')
-    else:
-        df_filtrado_asilo = df_filtrado[df_filtrado['SubRegiaoUNSDAsilo'].isin(filtroSubRegioes)]
-        refugiadosPorRegiao(df_filtrado_asilo, 'SubRegiaoUNSDAsilo', 'Sub-região de asilo', 'Refugiados por sub-região de asilo')
-        refugiadosPorAnoRegiao(df_filtrado_asilo, 'SubRegiaoUNSDAsilo', 'Refugiados por ano e sub-região de asilo')
-
-with abaMapa:
-    if filtroFluxo == 'Origem':
-        #refugiadosMapaMundi(df_filtrado, countries, 'Origem', 'Países de origem de refugiados')
-        refugiadosMapaMundi(df_filtrado, countries, 'Origem', 'Países de origem de refugiados')
+        refugiadosMapaMundi(df_paises, countries, 'Origem', 'Países de origem de refugiados')
     else:
-        refugiadosMapaMundi(df_filtrado, countries, 'Asilo', 'Países que concederam asilo para refugiados')
+        refugiadosMapaMundi(df_paises, countries, 'Asilo', 'Países que concederam asilo para refugiados')
 
-with abaOrigemAsilo:
+@st.fragment
+@perfil.perfilado
+def exibirAbaOrigemAsilo(versao, filtroAnos, filtroTP, filtroFluxo):
+    iniciarPayloadFragmento('abaOrigemAsilo')
+    rankingDados = carga.lerRanking(versao, filtroAnos, filtroTP)
 
     if filtroFluxo == 'Origem':
         with st.expander('**Filtro de país de origem**'):
+            lista = listaPaisesOrigem(versao, filtroAnos, filtroTP)
             filtroPaisOrigem = st.selectbox('País',
-                                listaPaisesOrigem(df_filtrado),
-                                index=None,
+                                lista,
+                                index=indiceSelecao(lista, selecaoLembrada('PaisOrigem', lista, None)),
                                 placeholder='Selecione uma opção...')
-            
-            df_filtrado_origem = df_filtrado.loc[df_filtrado['NomePaisOrigem'] == filtroPaisOrigem, ['NomePaisOrigem', 'TipoPopulacao', 'NomePaisAsilo', 'Quantidade']]        
+            lembrarSelecao('PaisOrigem', filtroPaisOrigem)
 
             todosAsilos = False
             if todosAsilos:
                 topAsilo = None
             else:
-                topAsilo = st.number_input("Mostrar no máximo", min_value=1, max_value=10, value=10, step=1, key="idAsilo")
+                topAsilo = lembrarSelecao('TopAsilo', st.number_input("Mostrar no máximo", min_value=1, max_value=10, value=selecaoLembrada('TopAsilo', range(1, 11), 10), step=1, key="idAsilo"))
 
-            df_filtrado_origem_top_asilo = agruparOutrosPaisesTipoPopulacao(df_filtrado_origem, 'Origem', 'Asilo', topAsilo)        
+            df_filtrado_origem_top_asilo = agruparOutrosPaisesTipoPopulacao(rankingDados, 'Origem', filtroPaisOrigem, topAsilo)        
             refugiadosPorPaisTipoPopulacao(df_filtrado_origem_top_asilo)
     else:
         with st.expander('**Filtro de país de asilo**'):
+            lista = listaPaisesAsilo(versao, filtroAnos, filtroTP)
             filtroPaisAsilo = st.selectbox('País',
-                                listaPaisesAsilo(df_filtrado),
-                                index=None,
+                                lista,
+                                index=indiceSelecao(lista, selecaoLembrada('PaisAsilo', lista, None)),
                                 placeholder='Selecione uma opção...')
-            
-            df_filtrado_asilo = df_filtrado.loc[df_filtrado['NomePaisAsilo'] == filtroPaisAsilo, ['NomePaisOrigem', 'TipoPopulacao', 'NomePaisAsilo', 'Quantidade']]
+            lembrarSelecao('PaisAsilo', filtroPaisAsilo)
             
             todosOrigens = False
             if todosOrigens:
                 topOrigem = None
             else:
-                topOrigem = st.number_input("Mostrar no máximo", min_value=1, max_value=10, value=10, step=1, key="idOrigem")
+                topOrigem = lembrarSelecao('TopOrigem', st.number_input("Mostrar no máximo", min_value=1, max_value=10, value=selecaoLembrada('TopOrigem', range(1, 11), 10), step=1, key="idOrigem"))
             
-            df_filtrado_asilo_top_origem = agruparOutrosPaisesTipoPopulacao(df_filtrado_asilo, 'Asilo', 'Origem', topOrigem)        
+            df_filtrado_asilo_top_origem = agruparOutrosPaisesTipoPopulacao(rankingDados, 'Asilo', filtroPaisAsilo, topOrigem)        
             refugiadosPorPaisTipoPopulacao(df_filtrado_asilo_top_origem)
 
+
+#################################################################
+# Principal
+#################################################################
+
+# painel de desempenho na barra lateral (tempos, caches e payload da execução)
+_PAINEL_DESEMPENHO_ = perfil.PAINEL_DESEMPENHO
+
+# tamanho dos gráficos enviados: só é medido quando alguém o consome
+_MEDIR_PAYLOAD_ = perfil.PAINEL_DESEMPENHO or bool(perfil.ARQUIVO_PERFIL)
+
+# calcular apenas a aba visível (as demais são calculadas quando selecionadas)
+_ABAS_SOB_DEMANDA_ = True
+
+def exibirPainelDesempenho(perfilExecucao):
+    with st.sidebar.expander('**Desempenho**'):
+        st.caption(f"Execução: {perfilExecucao['ms']:.0f} ms")
+        st.dataframe(perfil.tabelaEtapas(perfilExecucao), hide_index=True)
+        st.dataframe(perfil.tabelaCache(perfilExecucao), hide_index=True)
+        st.dataframe(relatorioPayload(), hide_index=True)
+
+def exibirPagina():
+    with perfil.etapa('carga'):
+        versao = carga.versaoDados()
+        indiceDados = carga.lerIndice(versao)
+        cuboDados = carga.lerCubo(versao)
+    perfil.anotar('versao', versao)
+    perfil.anotar('memoriaDados', int(dados.relatorioMemoria(indiceDados['dados']).loc['Total', 'Bytes']))
+
+    # tamanhos dos gráficos exibidos nesta execução, por fragmento
+    st.session_state['payloadExecucao'] = {}
+    st.session_state['payloadFragmento'] = 'script'
+
+    st.sidebar.title('Filtros')
+
+    filtroAnos = addFiltroAnos(versao)
+    filtroFluxo = addFiltroFluxo()
+    filtroTP = addFiltroTipoPopulacao(versao)
+
+    abaGeral, abaUNHCR, abaUNSD, abaSubUNSD, abaMapa, abaOrigemAsilo = st.tabs(['Geral','Regiões das Nações Unidas','Continentes','Sub Regiões','Mapa Mundi', 'Fluxo Origem/Asilo'],
+                                                                                 key='abaAtiva',
+                                                                                 on_change='rerun' if _ABAS_SOB_DEMANDA_ else 'ignore')
+
+    # com abas sob demanda, .open é False nas abas ocultas; sem elas é None e tudo é exibido
+    with abaGeral:
+        if abaGeral.open is not False:
+            exibirAbaGeral(versao, indiceDados, filtroAnos, filtroTP, filtroFluxo)
+
+    with abaUNHCR:
+        if abaUNHCR.open is not False:
+            exibirAbaRegiao(versao, filtroAnos, filtroTP, filtroFluxo, 'RegiaoUNHCR', listaRegiaoUNHCR, 'região', 'Regiões')
+
+    with abaUNSD:
+        if abaUNSD.open is not False:
+            exibirAbaRegiao(versao, filtroAnos, filtroTP, filtroFluxo, 'RegiaoUNSD', listaRegiaoUNSD, 'continente', 'Continentes')
+
+    with abaSubUNSD:
+        if abaSubUNSD.open is not False:
+            exibirAbaRegiao(versao, filtroAnos, filtroTP, filtroFluxo, 'SubRegiaoUNSD', listaSubRegiaoUNSD, 'sub-região', 'Sub-regiões')
+
+    with abaMapa:
+        if abaMapa.open is not False:
+            exibirAbaMapa(versao, cuboDados, filtroAnos, filtroTP, filtroFluxo)
+
+    with abaOrigemAsilo:
+        if abaOrigemAsilo.open is not False:
+            exibirAbaOrigemAsilo(versao, filtroAnos, filtroTP, filtroFluxo)
+
+# o script é executado como __main__ pelo `streamlit run`; importado (ex.: pelo
+# benchmark.py) expõe apenas as funções, sem montar a página
+def main():
+    # configuracoes do streamlit
+    st.set_page_config(layout='wide', 
+                       page_title='Dashboard - Refugiados',
+                       page_icon=':earth_africa:')
+
+    # https://streamlit-emoji-shortcodes-streamlit-app-gwckff.streamlit.app/
+    st.title("REFUGIADOS NO MUNDO :earth_africa:")
+
+    with perfil.execucao('script') as perfilExecucao:
+        exibirPagina()
+
+    if _PAINEL_DESEMPENHO_:
+        exibirPainelDesempenho(perfilExecucao)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import os
+
+import pandas as pd
+
+import cubo
+import dados
+
+
+#################################################################
+# Estruturas derivadas por ano
+#
+# Tabelas do cubo, coordenadas dos países e valores de cada dimensão, gravadas
+# por preprocessar.py em dados/versoes/<versao>/derivados/. Todas têm a coluna
+# Ano: numa atualização incremental só os anos afetados são recalculados e as
+# linhas dos demais anos vêm da versão anterior. Com elas, uma versão nova é
+# carregada sem recalcular nada sobre todo o histórico.
+#################################################################
+
+DIR_DERIVADOS = 'derivados'
+
+SENTIDOS = ['Origem', 'Asilo']
+
+
+def caminhoDerivados(versao):
+    return os.path.join(dados.caminhoVersao(versao), DIR_DERIVADOS)
+
+
+def derivadosDisponiveis(versao):
+    # derivados gravados antes das tabelas da hierarquia (cubo.py) são ignorados:
+    # o cubo volta a ser calculado das linhas e a próxima atualização os regrava
+    diretorio = caminhoDerivados(versao)
+    return all(os.path.exists(os.path.join(diretorio, f'{nome}.parquet'))
+               for nome in ['catalogo'] + [f'cubo-Hierarquia{sentido}' for sentido in SENTIDOS])
+
+
+def centroidesPorAno(df, sentido):
+    # o mínimo por ano; mapa.construirCentroides é o mínimo entre os anos
+    pais = 'NomePais' + sentido
+    return df.groupby(['Ano', pais], observed=True)[['Latitude' + sentido, 'Longitude' + sentido]].min().reset_index()
+
+
+def valoresPorAno(df):
+    valores = []
+    for coluna in dados.COLUNAS_CATEGORICAS:
+        if coluna in df.columns:
+            ocorrencias = df.groupby(['Ano', coluna], observed=True).size().reset_index()
+            valores.append(pd.DataFrame({'Ano': ocorrencias['Ano'], 'Coluna': coluna,
+                                         'Valor': ocorrencias[coluna].astype(str)}))
+    return pd.concat(valores, ignore_index=True).astype({'Coluna': 'category', 'Valor': 'category'})
+
+
+def construirDerivados(df):
+    tabelas = {f'cubo-{chave}': tabela for chave, tabela in cubo.construirCubo(df).items()}
+    tabelas.update({f'centroides-{sentido}': centroidesPorAno(df, sentido) for sentido in SENTIDOS})
+    tabelas['catalogo'] = valoresPorAno(df)
+    return tabelas
+
+
+def lerTabela(diretorio, nome):
+    tabela = pd.read_parquet(os.path.join(diretorio, f'{nome}.parquet'))
+    # o Parquet guarda os valores na ordem em que aparecem; as categorias voltam ordenadas
+    for coluna in tabela.columns:
+        if isinstance(tabela[coluna].dtype, pd.CategoricalDtype):
+            tabela[coluna] = tabela[coluna].cat.reorder_categories(sorted(tabela[coluna].cat.categories))
+    return tabela
+
+
+def gravarDerivados(df, destino, origem=None):
+    # Sem origem, calcula tudo a partir de df. Com origem (derivados da versão
+    # anterior), df traz só os anos afetados: as linhas desses anos são recalculadas
+    # e as dos demais anos são copiadas da origem.
+    anos = df['Ano'].unique()
+    with dados.diretorioPreparado(destino) as preparacao:
+        for nome, tabela in construirDerivados(df).items():
+            if origem is not None:
+                anterior = lerTabela(origem, nome)
+                anterior = anterior[~anterior['Ano'].isin(anos)]
+                tabela = pd.concat(dados.unirCategorias(anterior, tabela), ignore_index=True)
+            tabela.to_parquet(os.path.join(preparacao, f'{nome}.parquet'), index=False)
+
+
+def lerCubo(versao):
+    diretorio = caminhoDerivados(versao)
+    return {nome[len('cubo-'):-len('.parquet')]: lerTabela(diretorio, nome[:-len('.parquet')])
+            for nome in sorted(os.listdir(diretorio)) if nome.startswith('cubo-')}
+
+
+def lerCentroides(versao):
+    diretorio = caminhoDerivados(versao)
+    centroides = {}
+    for sentido in SENTIDOS:
+        tabela = lerTabela(diretorio, f'centroides-{sentido}')
+        centroides[sentido] = tabela.groupby('NomePais' + sentido, observed=True)[['Latitude' + sentido, 'Longitude' + sentido]].min()
+    return centroides
+
+
+def lerCatalogo(versao):
+    # mesmo formato de catalogo.construirCatalogo
+    valores = lerTabela(caminhoDerivados(versao), 'catalogo')
+    catalogo = {'Ano': (int(valores['Ano'].min()), int(valores['Ano'].max()))}
+    for coluna, grupo in valores.groupby('Coluna', observed=True):
+        catalogo[coluna] = sorted(grupo['Valor'].unique().tolist())
+    return catalogo
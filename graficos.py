@@ -0,0 +1,77 @@
+import hashlib
+import io
+import json
+
+import altair as alt
+import pandas as pd
+import pyarrow as pa
+
+
+#################################################################
+# Payload dos gráficos
+#
+# Os gráficos recebem dados já agregados. Antes de embutir os dados no spec,
+# as categorias não usadas são descartadas e os números reduzidos; conjuntos
+# de dados iguais recebem o mesmo nome (hash do conteúdo) e são enviados uma vez.
+#################################################################
+
+# acima disso o gráfico está recebendo linhas brutas em vez de dados agregados
+LIMITE_LINHAS = 5000
+
+
+def compactarDados(df):
+    compacto = df.reset_index(drop=True)
+    for coluna in compacto.columns:
+        valores = compacto[coluna]
+        if isinstance(valores.dtype, pd.CategoricalDtype):
+            # um DataFrame filtrado ainda carrega todas as categorias no dicionário
+            compacto[coluna] = valores.cat.remove_unused_categories()
+        elif pd.api.types.is_integer_dtype(valores.dtype):
+            compacto[coluna] = pd.to_numeric(valores, downcast='integer')
+        elif pd.api.types.is_float_dtype(valores.dtype):
+            compacto[coluna] = pd.to_numeric(valores, downcast='float')
+    return compacto
+
+
+def bytesArrow(df):
+    arquivo = io.BytesIO()
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.ipc.new_stream(arquivo, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    return arquivo.getvalue()
+
+
+def compactarGrafico(chart):
+    # aplica compactarDados aos dados do gráfico e de cada camada. O limite de
+    # linhas é verificado aqui: o st.altair_chart converte os dados com o próprio
+    # transformador (Arrow), sem passar pelos transformadores do Altair
+    chart = chart.copy(deep=False)
+    if isinstance(chart.data, pd.DataFrame):
+        chart.data = compactarDados(alt.limit_rows(chart.data, max_rows=LIMITE_LINHAS))
+    if isinstance(chart, alt.LayerChart):
+        chart.layer = [compactarGrafico(camada) for camada in chart.layer]
+    return chart
+
+
+def _nomearDados(chart, datasets):
+    # mesmo esquema usado pelo Streamlit: dados em Arrow nomeados pelo hash do conteúdo
+    chart = chart.copy(deep=False)
+    if isinstance(chart.data, pd.DataFrame):
+        conteudo = bytesArrow(chart.data)
+        nome = hashlib.sha1(conteudo).hexdigest()
+        datasets[nome] = conteudo
+        chart.data = alt.NamedData(name=nome)
+    if isinstance(chart, alt.LayerChart):
+        chart.layer = [_nomearDados(camada, datasets) for camada in chart.layer]
+    return chart
+
+
+def medirGrafico(chart):
+    # Retorna (hash, bytes) do que é enviado ao navegador: o spec em JSON mais os
+    # conjuntos de dados, contados uma única vez mesmo quando repetidos em camadas.
+    datasets = {}
+    spec = _nomearDados(chart, datasets).to_dict(validate=False)
+    texto = json.dumps(spec, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+    assinatura = hashlib.sha1(texto)
+    return assinatura.hexdigest(), len(texto) + sum(len(conteudo) for conteudo in datasets.values())
@@ -0,0 +1,147 @@
+import numpy as np
+
+import cubo
+
+
+#################################################################
+# Hierarquia geográfica
+#
+# Totais de cada nível (continente → sub-região → país, e as regiões UNHCR, que
+# agrupam os mesmos países) dos dois sentidos, a partir das tabelas
+# 'Hierarquia<sentido>' do cubo. Por versão dos dados, a estrutura guarda os
+# valores distintos de cada nível e a posição, no nível, de cada valor do nível
+# abaixo. Por filtro, as linhas do cubo são somadas nos países e cada nível é
+# somado do nível abaixo (np.bincount), sem reagrupar tabelas. As abas de região
+# e o detalhamento de uma região em sub-regiões e países são seleções nos níveis.
+#################################################################
+
+# nível: nível abaixo dele, do qual é somado
+NIVEIS = {
+    'SubRegiaoUNSD': 'NomePais',
+    'RegiaoUNSD': 'SubRegiaoUNSD',
+    'RegiaoUNHCR': 'NomePais',
+}
+
+# colunas (sem o sufixo do sentido) que identificam cada nível: as dos níveis
+# acima vêm junto, para o detalhamento
+COLUNAS_NIVEL = {
+    'NomePais': ['RegiaoUNHCR', 'RegiaoUNSD', 'SubRegiaoUNSD', 'NomePais'],
+    'SubRegiaoUNSD': ['RegiaoUNSD', 'SubRegiaoUNSD'],
+    'RegiaoUNSD': ['RegiaoUNSD'],
+    'RegiaoUNHCR': ['RegiaoUNHCR'],
+}
+
+# o que exibir ao detalhar um valor de cada nível
+DETALHES = {
+    'RegiaoUNSD': ['SubRegiaoUNSD', 'NomePais'],
+    'SubRegiaoUNSD': ['NomePais'],
+    'RegiaoUNHCR': ['NomePais'],
+}
+
+
+def agruparChaves(tabela, colunas):
+    # valores distintos de `colunas` e a posição de cada linha da tabela entre eles;
+    # os ausentes formam grupos próprios (a linha continua somando no nível de cima)
+    grupos = tabela.groupby(colunas, observed=True, dropna=False)
+    return grupos.size().reset_index()[colunas], grupos.ngroup().to_numpy()
+
+
+def construirEstruturaSentido(tabela, sentido):
+    def colunas(nivel):
+        return ['Ano'] + [coluna + sentido for coluna in COLUNAS_NIVEL[nivel]]
+
+    niveis = {}
+    chaves, grupo = agruparChaves(tabela, colunas('NomePais'))
+    niveis['NomePais'] = {'porAno': (chaves, None)}
+    for nivel, abaixo in NIVEIS.items():
+        niveis[nivel] = {'porAno': agruparChaves(niveis[abaixo]['porAno'][0], colunas(nivel))}
+    # o total de cada nível é somado dos anos do mesmo nível
+    for nome, nivel in niveis.items():
+        nivel['total'] = agruparChaves(nivel['porAno'][0], colunas(nome)[1:])
+
+    return {
+        'sentido': sentido,
+        'anos': tabela['Ano'].to_numpy(),
+        'tipos': tabela['TipoPopulacao'],
+        'medidas': {medida: tabela[medida].to_numpy() for medida in cubo.MEDIDAS_CUBO},
+        'grupo': grupo,
+        'niveis': niveis,
+    }
+
+
+def construirEstrutura(cuboDados):
+    # por versão dos dados
+    return [construirEstruturaSentido(cuboDados['Hierarquia' + sentido], sentido)
+            for sentido in cubo.SENTIDOS if 'Hierarquia' + sentido in cuboDados]
+
+
+def somar(posicoes, medidas, tamanho):
+    return {medida: np.bincount(posicoes, weights=valores, minlength=tamanho) for medida, valores in medidas.items()}
+
+
+def tabelaNivel(chaves, medidas, tipos):
+    # só os valores com alguma linha no filtro, como o groupby(observed=True) do
+    # cubo; as somas do bincount voltam a inteiros de 64 bits: o cubo pode guardar
+    # as medidas em int32 (Quantidade reduzida na leitura do CSV), mas o total de
+    # uma região passa de 2^31
+    presentes = medidas['Linhas'] > 0
+    tabela = chaves[presentes].reset_index(drop=True)
+    for medida in cubo.MEDIDAS_CUBO:
+        tabela[medida] = medidas[medida][presentes].astype(np.result_type(tipos[medida], np.int64))
+    return tabela
+
+
+def construirNiveis(estrutura, filtroAnos, filtroTP):
+    anos = estrutura['anos']
+    filtro = (anos >= filtroAnos[0]) & (anos <= filtroAnos[1]) & estrutura['tipos'].isin(filtroTP).to_numpy()
+    niveis = estrutura['niveis']
+    tipos = {medida: valores.dtype for medida, valores in estrutura['medidas'].items()}
+
+    # países por ano a partir das linhas do cubo; cada nível acima, do nível abaixo
+    somas = {'NomePais': somar(estrutura['grupo'][filtro],
+                               {medida: valores[filtro] for medida, valores in estrutura['medidas'].items()},
+                               len(niveis['NomePais']['porAno'][0]))}
+    for nivel, abaixo in NIVEIS.items():
+        chaves, pai = niveis[nivel]['porAno']
+        somas[nivel] = somar(pai, somas[abaixo], len(chaves))
+
+    hierarquia = {}
+    for nivel, somasAno in somas.items():
+        chavesTotal, paiTotal = niveis[nivel]['total']
+        hierarquia[nivel + estrutura['sentido']] = {
+            'porAno': tabelaNivel(niveis[nivel]['porAno'][0], somasAno, tipos),
+            'total': tabelaNivel(chavesTotal, somar(paiTotal, somasAno, len(chavesTotal)), tipos),
+        }
+    return hierarquia
+
+
+def construirHierarquia(estrutura, filtroAnos, filtroTP):
+    # níveis dos dois sentidos, chaveados pela coluna (ex.: 'RegiaoUNSDOrigem')
+    hierarquia = {}
+    for estruturaSentido in estrutura:
+        hierarquia.update(construirNiveis(estruturaSentido, filtroAnos, filtroTP))
+    return hierarquia
+
+
+def selecionarNivel(hierarquia, nivel, porAno, filtro):
+    # soma por valor do nível: o mesmo valor pode aparecer sob mais de um valor do
+    # nível de cima (ex.: um país em duas regiões UNHCR); os ausentes são descartados
+    tabela = hierarquia[nivel]['porAno' if porAno else 'total']
+    if filtro is not None:
+        tabela = tabela[filtro(tabela)]
+    por = ['Ano', nivel] if porAno else [nivel]
+    return tabela.groupby(por, observed=True)[cubo.MEDIDAS_CUBO].sum().reset_index()
+
+
+def consultarNivel(hierarquia, coluna, valores=None, porAno=False):
+    # totais de cada valor do nível, no formato de cubo.consultarCubo
+    return selecionarNivel(hierarquia, coluna, porAno,
+                           None if valores is None else lambda tabela: tabela[coluna].isin(valores))
+
+
+def detalharValor(hierarquia, coluna, valor, porAno=False):
+    # os níveis abaixo de um valor (ex.: as sub-regiões e os países de um
+    # continente), cada um no formato de consultarNivel: {coluna: tabela}
+    sentido = cubo.sentidoDimensao(coluna)
+    return {abaixo + sentido: selecionarNivel(hierarquia, abaixo + sentido, porAno, lambda tabela: tabela[coluna] == valor)
+            for abaixo in DETALHES.get(coluna[:-len(sentido)], [])}
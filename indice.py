@@ -0,0 +1,96 @@
+import collections
+import threading
+
+import numpy as np
+
+
+#################################################################
+# Índice por (TipoPopulacao, Ano)
+#
+# As linhas são ordenadas por tipo de população e ano. Dentro do bloco de cada tipo
+# os anos ficam contíguos, então qualquer filtro de intervalo de anos + tipos vira
+# no máximo uma fatia por tipo, localizada por busca binária em vez de máscaras.
+#################################################################
+
+# quantos filtros manter em memória (só as faixas de linhas, não os dados)
+TAMANHO_MEMO = 32
+
+
+def ordenadoPorTipoAno(df):
+    tipos = df['TipoPopulacao'].cat.codes.to_numpy()
+    anos = df['Ano'].to_numpy()
+    if (tipos < 0).any():
+        # tipos nulos vão para o fim na ordenação
+        return False
+    return bool(np.all((tipos[1:] > tipos[:-1]) | ((tipos[1:] == tipos[:-1]) & (anos[1:] >= anos[:-1]))))
+
+
+def construirIndice(df):
+    # dados já ordenados (ex.: o arquivo compartilhado) são usados sem cópia
+    dados = df if ordenadoPorTipoAno(df) else df.sort_values(['TipoPopulacao', 'Ano'], kind='stable')
+    anos = dados['Ano'].to_numpy()
+
+    # posição inicial e final (exclusiva) do bloco de cada tipo de população, a partir
+    # das trocas de código (um groupby alocaria vetores do tamanho dos dados)
+    tipos = dados['TipoPopulacao'].cat.codes.to_numpy()
+    inicios = np.flatnonzero(tipos[1:] != tipos[:-1]) + 1
+    inicios = np.concatenate([[0], inicios]) if len(tipos) else inicios
+    fins = np.append(inicios[1:], len(tipos))
+    categorias = dados['TipoPopulacao'].cat.categories
+    blocos = {categorias[tipos[inicio]]: (int(inicio), int(fim))
+              for inicio, fim in zip(inicios, fins) if tipos[inicio] >= 0}
+
+    return {
+        'dados': dados,
+        'anos': anos,
+        'blocos': blocos,
+        'memo': collections.OrderedDict(),
+        'trava': threading.Lock(),
+    }
+
+
+def faixasIndice(indice, filtroAnos, filtroTP):
+    # intervalos [inicio, fim) de linhas que atendem ao filtro, já unindo os contíguos
+    faixas = []
+    for tipo, (inicio, fim) in indice['blocos'].items():
+        if tipo not in filtroTP:
+            continue
+        anos = indice['anos'][inicio:fim]
+        a = inicio + int(np.searchsorted(anos, filtroAnos[0], side='left'))
+        b = inicio + int(np.searchsorted(anos, filtroAnos[1], side='right'))
+        if a >= b:
+            continue
+        if faixas and faixas[-1][1] == a:
+            faixas[-1] = (faixas[-1][0], b)
+        else:
+            faixas.append((a, b))
+    return faixas
+
+
+def filtrarIndice(indice, filtroAnos, filtroTP):
+    # Seleções repetidas reaproveitam as faixas já localizadas; o memo guarda só os
+    # limites das faixas, e o recorte é refeito a cada chamada: um resultado com mais
+    # de uma faixa é uma cópia (take) dos dados, que não vale manter em memória.
+    # Quem precisa reaproveitar o recorte (ex.: o ranking) já o guarda em cache.
+    # O resultado pode ser uma fatia dos dados compartilhados: não deve ser alterado.
+    chave = (int(filtroAnos[0]), int(filtroAnos[1]), frozenset(filtroTP))
+    memo = indice['memo']
+    with indice['trava']:
+        faixas = memo.get(chave)
+        if faixas is not None:
+            memo.move_to_end(chave)
+
+    if faixas is None:
+        faixas = faixasIndice(indice, filtroAnos, filtroTP)
+        with indice['trava']:
+            memo[chave] = faixas
+            if len(memo) > TAMANHO_MEMO:
+                memo.popitem(last=False)
+
+    dados = indice['dados']
+    if len(faixas) == 1:
+        # uma única fatia contígua não copia os dados
+        return dados.iloc[faixas[0][0]:faixas[0][1]]
+    if not faixas:
+        return dados.iloc[0:0]
+    return dados.take(np.concatenate([np.arange(a, b) for a, b in faixas]))
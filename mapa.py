@@ -0,0 +1,137 @@
+import json
+import os
+
+
+#################################################################
+# Mapa mundi local
+#
+# A geometria dos países (Natural Earth 1:110m, domínio público) fica em
+# static/mapas/ e é servida pelo próprio Streamlit (server.enableStaticServing),
+# então o mapa funciona sem acesso externo e o navegador guarda o arquivo em cache.
+# Os níveis de detalhe menores são gerados a partir do nível 'alto' com
+# `python mapa.py`.
+#################################################################
+
+DIR_MAPAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'mapas')
+URL_MAPAS = 'app/static/mapas'
+
+# tolerância da simplificação (em graus) e casas decimais de cada nível
+NIVEIS_MAPA = {
+    'baixo': (0.5, 1),
+    'médio': (0.25, 2),
+    'alto': (0, 3),
+}
+
+ARQUIVOS_MAPA = {'baixo': 'mundo-baixo.json', 'médio': 'mundo-medio.json', 'alto': 'mundo-alto.json'}
+
+
+def caminhoMapa(nivel):
+    return os.path.join(DIR_MAPAS, ARQUIVOS_MAPA[nivel])
+
+
+def urlMapa(nivel):
+    return f'{URL_MAPAS}/{ARQUIVOS_MAPA[nivel]}'
+
+
+#################################################################
+# Simplificação (Douglas-Peucker)
+#################################################################
+
+def _distanciaSegmento(ponto, inicio, fim):
+    (x, y), (x1, y1), (x2, y2) = ponto, inicio, fim
+    dx, dy = x2 - x1, y2 - y1
+    if dx == 0 and dy == 0:
+        return ((x - x1) ** 2 + (y - y1) ** 2) ** 0.5
+    t = max(0, min(1, ((x - x1) * dx + (y - y1) * dy) / (dx * dx + dy * dy)))
+    return ((x - x1 - t * dx) ** 2 + (y - y1 - t * dy) ** 2) ** 0.5
+
+
+def simplificarLinha(pontos, tolerancia):
+    manter = [False] * len(pontos)
+    manter[0] = manter[-1] = True
+    pilha = [(0, len(pontos) - 1)]
+    while pilha:
+        inicio, fim = pilha.pop()
+        maior, posicao = 0, None
+        for i in range(inicio + 1, fim):
+            distancia = _distanciaSegmento(pontos[i], pontos[inicio], pontos[fim])
+            if distancia > maior:
+                maior, posicao = distancia, i
+        if posicao is not None and maior > tolerancia:
+            manter[posicao] = True
+            pilha.extend([(inicio, posicao), (posicao, fim)])
+    return [ponto for ponto, fica in zip(pontos, manter) if fica]
+
+
+def _area(anel):
+    return sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(anel, anel[1:])) / 2
+
+
+def simplificarAnel(anel, tolerancia, decimais):
+    # o anel é fechado (primeiro ponto == último); divide em duas metades para o DP
+    meio = len(anel) // 2
+    pontos = simplificarLinha(anel[:meio + 1], tolerancia)[:-1] + simplificarLinha(anel[meio:], tolerancia)
+    pontos = [[round(x, decimais), round(y, decimais)] for x, y in pontos]
+
+    # anéis que degeneram ou invertem a orientação somem nesse nível de detalhe
+    if len(pontos) < 4 or _area(pontos) == 0 or (_area(pontos) > 0) != (_area(anel) > 0):
+        return None
+    return pontos
+
+
+def simplificarPoligono(poligono, tolerancia, decimais):
+    aneis = [simplificarAnel(anel, tolerancia, decimais) for anel in poligono]
+    if aneis[0] is None:
+        return None
+    return [anel for anel in aneis if anel is not None]
+
+
+def simplificarMapa(mapa, tolerancia, decimais):
+    features = []
+    for feature in mapa['features']:
+        geometria = feature['geometry']
+        poligonos = [geometria['coordinates']] if geometria['type'] == 'Polygon' else geometria['coordinates']
+        simplificados = [p for p in (simplificarPoligono(p, tolerancia, decimais) for p in poligonos) if p]
+        if not simplificados:
+            # o país nunca desaparece: mantém o maior polígono só com o arredondamento
+            maior = max(poligonos, key=lambda p: abs(_area(p[0])))
+            simplificados = [simplificarPoligono(maior, 0, decimais) or maior]
+        features.append({
+            'type': 'Feature',
+            'properties': feature['properties'],
+            'geometry': {'type': 'MultiPolygon', 'coordinates': simplificados},
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def gerarNiveis():
+    with open(caminhoMapa('alto'), 'r', encoding='utf-8') as arquivo:
+        mapa = json.load(arquivo)
+
+    for nivel, (tolerancia, decimais) in NIVEIS_MAPA.items():
+        if nivel == 'alto':
+            continue
+        with open(caminhoMapa(nivel), 'w', encoding='utf-8') as arquivo:
+            json.dump(simplificarMapa(mapa, tolerancia, decimais), arquivo, separators=(',', ':'))
+        print(f'{nivel}: {os.path.getsize(caminhoMapa(nivel))} bytes')
+
+
+#################################################################
+# Centroides dos países
+#################################################################
+
+# sentido: Origem | Asilo
+def construirCentroides(df, sentido):
+    # uma coordenada por país, calculada uma vez por versão dos dados
+    pais = 'NomePais' + sentido
+    colunas = ['Latitude' + sentido, 'Longitude' + sentido]
+    return df.groupby(pais, observed=True)[colunas].min()
+
+
+def pontosMapa(totais, centroides):
+    # junta os totais já agregados por país às coordenadas pré-calculadas
+    return totais.join(centroides, on=centroides.index.name, how='inner')
+
+
+if __name__ == '__main__':
+    gerarNiveis()
@@ -0,0 +1,63 @@
+import concurrent.futures
+import os
+import threading
+import time
+
+import perfil
+
+
+#################################################################
+# Agregações em paralelo
+#
+# Consultas independentes de uma execução (ex.: as do cubo que alimentam os
+# gráficos de uma aba) são iniciadas juntas num pool de threads limitado e os
+# resultados são reunidos antes de exibir os gráficos. O pool é do processo,
+# compartilhado por todas as sessões. As tarefas não devem chamar funções do
+# Streamlit: elas executam fora da thread da sessão.
+#################################################################
+
+# número de threads do pool; 0 ou 1 executa as tarefas em sequência, na thread da sessão
+TRABALHADORES = int(os.environ.get('DASHBOARD_TRABALHADORES', min(4, os.cpu_count() or 1)))
+
+_pool = None
+_travaPool = threading.Lock()
+_local = threading.local()
+
+
+def poolAgregacoes():
+    global _pool
+    with _travaPool:
+        if _pool is None:
+            _pool = concurrent.futures.ThreadPoolExecutor(max_workers=TRABALHADORES,
+                                                          thread_name_prefix='agregacao',
+                                                          initializer=_marcarTrabalhador)
+        return _pool
+
+
+def _marcarTrabalhador():
+    _local.trabalhador = True
+
+
+def _medir(funcao, args):
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    return resultado, round((time.perf_counter() - inicio) * 1000, 2)
+
+
+def executar(tarefas):
+    # tarefas: {nome: (funcao, *args)}; devolve {nome: resultado}.
+    # Cada tarefa vira uma etapa do perfil com o tempo dela; a etapa 'paralelo'
+    # mede o tempo até o último resultado.
+    with perfil.etapa('paralelo'):
+        # uma tarefa só, pool desativado ou já dentro do pool (esperar por outra
+        # tarefa do mesmo pool poderia travar): em sequência
+        if len(tarefas) <= 1 or TRABALHADORES <= 1 or getattr(_local, 'trabalhador', False):
+            medidas = {nome: _medir(tarefa[0], tarefa[1:]) for nome, tarefa in tarefas.items()}
+        else:
+            pool = poolAgregacoes()
+            futuros = {nome: pool.submit(_medir, tarefa[0], tarefa[1:]) for nome, tarefa in tarefas.items()}
+            medidas = {nome: futuro.result() for nome, futuro in futuros.items()}
+
+        for nome, (_, ms) in medidas.items():
+            perfil.registrarEtapa(nome, ms)
+    return {nome: resultado for nome, (resultado, _) in medidas.items()}
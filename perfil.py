@@ -0,0 +1,199 @@
+import contextlib
+import contextvars
+import datetime
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+
+#################################################################
+# Perfil de execução
+#
+# Cada execução do script (ou de um fragmento) registra o tempo e a variação de
+# memória de cada etapa, as chamadas e falhas dos caches e valores de contexto
+# (filtros). Ao final o registro vira uma linha JSON, para agregar perfis de
+# várias sessões, e pode ser exibido no painel de desempenho.
+#################################################################
+
+logger = logging.getLogger(__name__)
+
+# arquivo JSON lines com um registro por execução; vazio desativa a gravação
+ARQUIVO_PERFIL = os.environ.get('DASHBOARD_ARQUIVO_PERFIL', '')
+
+# exibe o painel de desempenho na barra lateral
+PAINEL_DESEMPENHO = os.environ.get('DASHBOARD_PAINEL_DESEMPENHO', '0') == '1'
+
+# o perfil ativo na thread da sessão (cada sessão executa o script na sua thread)
+_perfilAtual = contextvars.ContextVar('perfil', default=None)
+
+_travaArquivo = threading.Lock()
+
+
+def memoriaProcesso():
+    # memória residente do processo; é compartilhada por todas as sessões, então a
+    # variação de uma etapa inclui o que outras sessões alocaram ao mesmo tempo
+    try:
+        with open('/proc/self/statm') as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def iniciarPerfil(nome):
+    return {
+        'execucao': nome,
+        'inicio': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds'),
+        'processo': os.getpid(),
+        'etapas': [],
+        'cache': {},
+        'contexto': {},
+        'pilha': [],
+    }
+
+
+@contextlib.contextmanager
+def etapa(nome):
+    # Mede o bloco como uma etapa do perfil ativo; etapas aninhadas recebem o nome
+    # da etapa externa como prefixo (ex.: refugiadosPorTipo/serialização).
+    perfil = _perfilAtual.get()
+    if perfil is None:
+        yield
+        return
+
+    perfil['pilha'].append(nome)
+    # registrada ao entrar, para a lista seguir a ordem de início das etapas
+    registro = {'etapa': '/'.join(perfil['pilha']), 'ms': None, 'memoria': None}
+    perfil['etapas'].append(registro)
+    memoria = memoriaProcesso()
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registro['ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+        depois = memoriaProcesso()
+        if memoria is not None and depois is not None:
+            registro['memoria'] = depois - memoria
+        perfil['pilha'].pop()
+
+
+def registrarEtapa(nome, ms):
+    # etapa medida fora da thread da sessão (paralelo.py), registrada depois; a
+    # memória do processo não é atribuível a ela
+    perfil = _perfilAtual.get()
+    if perfil is not None:
+        perfil['etapas'].append({'etapa': '/'.join(perfil['pilha'] + [nome]), 'ms': ms, 'memoria': None})
+
+
+def medirEtapa(funcao):
+    # decorador: cada chamada da função é uma etapa com o nome dela
+    @functools.wraps(funcao)
+    def medida(*args, **kwargs):
+        with etapa(funcao.__name__):
+            return funcao(*args, **kwargs)
+    return medida
+
+
+@contextlib.contextmanager
+def execucao(nome):
+    # Com um perfil já ativo (ex.: fragmento chamado pelo script) o bloco é apenas
+    # uma etapa; sozinho (ex.: o fragmento reexecutado) abre e grava um perfil próprio.
+    if _perfilAtual.get() is not None:
+        with etapa(nome):
+            yield _perfilAtual.get()
+        return
+
+    perfil = iniciarPerfil(nome)
+    token = _perfilAtual.set(perfil)
+    inicio = time.perf_counter()
+    try:
+        yield perfil
+    finally:
+        perfil['ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+        _perfilAtual.reset(token)
+        gravarPerfil(perfil)
+
+
+def perfilado(funcao):
+    # decorador de execucao(), para os fragmentos
+    @functools.wraps(funcao)
+    def executar(*args, **kwargs):
+        with execucao(funcao.__name__):
+            return funcao(*args, **kwargs)
+    return executar
+
+
+def anotar(chave, valor):
+    perfil = _perfilAtual.get()
+    if perfil is not None:
+        perfil['contexto'][chave] = valor
+
+
+def registrarCache(nome, falha=False):
+    perfil = _perfilAtual.get()
+    if perfil is None:
+        return
+    contagem = perfil['cache'].setdefault(nome, {'chamadas': 0, 'falhas': 0})
+    if falha:
+        contagem['falhas'] += 1
+    else:
+        contagem['chamadas'] += 1
+
+
+def emCache(cacheador):
+    # Envolve st.cache_data/st.cache_resource contando chamadas e falhas: o corpo
+    # da função só executa quando o valor não está no cache.
+    #   @perfil.emCache(st.cache_data(max_entries=2))
+    def decorador(funcao):
+        nome = funcao.__name__
+
+        # functools.wraps mantém nome e código da função original, que o
+        # Streamlit usa para identificar o cache
+        @functools.wraps(funcao)
+        def calcular(*args, **kwargs):
+            registrarCache(nome, falha=True)
+            with etapa(nome):
+                return funcao(*args, **kwargs)
+        cacheada = cacheador(calcular)
+
+        @functools.wraps(funcao)
+        def consultar(*args, **kwargs):
+            registrarCache(nome)
+            return cacheada(*args, **kwargs)
+        consultar.clear = cacheada.clear
+        return consultar
+    return decorador
+
+
+def registroPerfil(perfil):
+    registro = {chave: valor for chave, valor in perfil.items() if chave != 'pilha'}
+    return json.dumps(registro, ensure_ascii=False, default=str)
+
+
+def gravarPerfil(perfil):
+    linha = registroPerfil(perfil)
+    logger.debug('Perfil: %s', linha)
+    if not ARQUIVO_PERFIL:
+        return
+    try:
+        with _travaArquivo, open(ARQUIVO_PERFIL, 'a', encoding='utf-8') as arquivo:
+            arquivo.write(linha + '\n')
+    except OSError as erro:
+        logger.warning('Não foi possível gravar o perfil em %s: %s', ARQUIVO_PERFIL, erro)
+
+
+def tabelaEtapas(perfil):
+    etapas = pd.DataFrame(perfil['etapas'], columns=['etapa', 'ms', 'memoria'])
+    etapas['memoria'] = etapas['memoria'].astype('float64') / 1e6
+    return etapas.rename(columns={'etapa': 'Etapa', 'memoria': 'Δ memória MB'})
+
+
+def tabelaCache(perfil):
+    cache = pd.DataFrame([(nome, contagem['chamadas'], contagem['falhas']) for nome, contagem in perfil['cache'].items()],
+                         columns=['Função', 'Chamadas', 'Falhas'])
+    cache['Acertos'] = cache['Chamadas'] - cache['Falhas']
+    return cache
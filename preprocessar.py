@@ -0,0 +1,137 @@
+import argparse
+import hashlib
+import logging
+import os
+import sys
+
+import dados
+import derivados
+
+
+#################################################################
+# Pré-processamento
+#
+# Converte o CSV de uma versão dos dados em partições Parquet por Ano
+# (dados/versoes/<versao>/particoes/), validando o esquema antes, e grava as
+# estruturas derivadas por ano (derivados.py). Com as partições presentes, o
+# dashboard deixa de interpretar o CSV ao carregar.
+#
+#   python preprocessar.py                 # versão atual do manifesto
+#   python preprocessar.py --versao <v>
+#   python preprocessar.py --csv arquivo.csv --destino dir/   # fora de dados/
+#   python preprocessar.py --validar       # só valida o esquema
+#
+# Atualização incremental: um CSV com os anos novos (ou corrigidos) gera uma
+# versão nova a partir da atual, regravando só as partições e as linhas derivadas
+# desses anos, e o manifesto passa a apontar para ela de uma vez.
+#
+#   python preprocessar.py --incremental anos.csv [--modo substituir|acrescentar]
+#################################################################
+
+def argumentos():
+    parser = argparse.ArgumentParser(description='Gera as partições por ano a partir do CSV dos dados')
+    parser.add_argument('--versao', help='versão em dados/versoes/ (padrão: a versão atual do manifesto)')
+    parser.add_argument('--csv', help='CSV a converter, no lugar de uma versão de dados/')
+    parser.add_argument('--destino', help='diretório das partições (obrigatório com --csv)')
+    parser.add_argument('--validar', action='store_true', help='apenas valida o esquema, sem gravar')
+    parser.add_argument('--incremental', metavar='CSV',
+                        help='CSV com os anos a atualizar na versão atual (gera uma versão nova)')
+    parser.add_argument('--modo', choices=['substituir', 'acrescentar'], default='substituir',
+                        help='substituir os anos do CSV incremental ou acrescentar as linhas a eles (padrão: substituir)')
+    args = parser.parse_args()
+    if args.csv and not args.destino and not args.validar:
+        parser.error('--destino é obrigatório com --csv')
+    return args
+
+
+def arquivoSha256(caminho):
+    sha256 = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(dados.TAMANHO_BLOCO), b''):
+            sha256.update(bloco)
+    return sha256.hexdigest()
+
+
+def atualizarIncremental(csv, modo):
+    novos = dados.lerCsvTipado(csv)
+
+    with dados.travaArquivo():
+        manifesto = dados.lerManifesto()
+        if not dados.copiaLocalValida(manifesto) or not dados.particoesDisponiveis(manifesto['versao']):
+            raise SystemExit('A versão atual não tem partições: execute `python preprocessar.py` antes')
+        base = manifesto['versao']
+
+        # o mesmo arquivo não é aplicado duas vezes seguidas (no modo acrescentar
+        # duplicaria as linhas) e, sobre a mesma base, gera sempre a mesma versão
+        sha256 = arquivoSha256(csv)
+        versao = hashlib.sha256(f'{base}:{modo}:{sha256}'.encode()).hexdigest()[:12]
+        if manifesto.get('sha256Incremental') == sha256 or os.path.exists(dados.caminhoVersao(versao)):
+            print(f'Atualização já aplicada na versão {base}')
+            return 0
+
+        with dados.diretorioPreparado(dados.caminhoVersao(versao)) as preparacao:
+            particoes = os.path.join(preparacao, dados.DIR_PARTICOES)
+            anos = dados.atualizarParticoes(dados.caminhoParticoes(base), particoes, novos, modo)
+
+            origem = derivados.caminhoDerivados(base) if derivados.derivadosDisponiveis(base) else None
+            if origem is None:
+                # sem derivados na versão anterior, são calculados para todos os anos
+                afetados = dados.lerParticoes(particoes)
+            else:
+                # só as linhas dos anos afetados são recalculadas
+                afetados = dados.lerParticoes(particoes, (anos[0], anos[-1]))
+                afetados = afetados[afetados['Ano'].isin(anos)]
+            derivados.gravarDerivados(afetados, os.path.join(preparacao, derivados.DIR_DERIVADOS), origem)
+
+        if dados.MEMORIA_COMPARTILHADA:
+            dados.converterArrow(versao)
+
+        # a troca do manifesto é atômica: cada processo do dashboard vê a versão
+        # anterior ou a nova, e só passa a servir a nova depois de aquecê-la
+        # (carga.versaoDados)
+        dados.gravarManifesto(dict(manifesto, versao=versao, base=base, anosAtualizados=anos, modo=modo,
+                                   sha256Incremental=sha256))
+        dados.removerVersoesAntigas(manter={versao})
+
+    print(f'Versão {versao} gerada a partir de {base}: anos {anos} ({modo})')
+    return 0
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    args = argumentos()
+
+    if args.incremental:
+        return atualizarIncremental(args.incremental, args.modo)
+
+    if args.csv:
+        versao, csv, destino = None, args.csv, args.destino
+    else:
+        versao = args.versao or dados.garantirDados()['versao']
+        csv, destino = dados.caminhoDados(versao), dados.caminhoParticoes(versao)
+
+    df = dados.lerCsvTipado(csv)
+    problemas = dados.validarEsquema(df)
+    for problema in problemas:
+        print(f'Esquema: {problema}', file=sys.stderr)
+    if problemas:
+        return 1
+    if args.validar:
+        print(f'{csv}: esquema válido ({len(df)} linhas)')
+        return 0
+
+    if versao is None:
+        os.makedirs(os.path.dirname(os.path.normpath(destino)) or '.', exist_ok=True)
+        manifesto = dados.gravarParticoes(df, destino)
+    else:
+        # mesma trava do download: a versão não é removida durante a gravação
+        with dados.travaArquivo():
+            manifesto = dados.gravarParticoes(df, destino)
+            derivados.gravarDerivados(df, derivados.caminhoDerivados(versao))
+
+    print(f'{len(manifesto["particoes"])} partições gravadas em {destino} ({manifesto["linhas"]} linhas)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+
+#################################################################
+# Ranking de parceiros
+#
+# Para um filtro de anos e tipos de população, os totais de cada par de países
+# ficam ordenados de forma decrescente dentro do bloco de cada país (de origem ou
+# de asilo), com o restante acumulado: quanto o bloco soma da posição i até o fim,
+# por tipo de população. O top N de qualquer país, para qualquer N, é uma fatia
+# do bloco e o "Outros" é o restante na posição N, sem reagrupar nem reordenar as
+# linhas a cada seleção.
+#################################################################
+
+SENTIDOS = ['Origem', 'Asilo']
+
+
+def outroSentido(sentido):
+    return 'Asilo' if sentido == 'Origem' else 'Origem'
+
+
+def rankingSentido(pares, sentido, porTipo):
+    grupo = 'NomePais' + sentido
+    parceiro = 'NomePais' + outroSentido(sentido)
+    chaves = [grupo, 'TipoPopulacao', parceiro] if porTipo else [grupo, parceiro]
+    tabela = pares if porTipo else pares.groupby(chaves, observed=True)['Quantidade'].sum().reset_index()
+
+    # uma ordenação por (país, quantidade decrescente) para todos os países de uma vez
+    codigos = tabela[grupo].cat.codes.to_numpy()
+    quantidades = tabela['Quantidade'].to_numpy(dtype='int64')
+    ordem = np.lexsort((-quantidades, codigos))
+    tabela = tabela.take(ordem).reset_index(drop=True)
+    codigos, quantidades = codigos[ordem], quantidades[ordem]
+
+    # bloco [inicio, fim) de cada país, a partir das trocas de código (como no indice.py)
+    inicios = np.flatnonzero(codigos[1:] != codigos[:-1]) + 1
+    # sem linhas no filtro (ex.: nenhum tipo selecionado) não há blocos
+    inicios = np.concatenate([[0], inicios]) if len(codigos) else inicios
+    fins = np.append(inicios[1:], len(codigos)) if len(codigos) else inicios
+    categorias = tabela[grupo].cat.categories
+    blocos = {categorias[codigos[inicio]]: (int(inicio), int(fim)) for inicio, fim in zip(inicios, fins)}
+
+    # quantidade por tipo de população (uma coluna por tipo; sem tipo, uma só)
+    tipos = list(tabela['TipoPopulacao'].cat.categories) if porTipo else [None]
+    colunaTipo = tabela['TipoPopulacao'].cat.codes.to_numpy() if porTipo else np.zeros(len(tabela), dtype='int64')
+    valores = np.zeros((len(tabela), len(tipos)), dtype='int64')
+    valores[np.arange(len(tabela)), colunaTipo] = quantidades
+
+    # restante[i] = soma do bloco da posição i até o fim; restante[inicio] é o total do país
+    acumulado = np.cumsum(valores, axis=0)
+    restante = acumulado[np.repeat(fins, fins - inicios) - 1] - acumulado + valores
+
+    return {
+        'grupo': grupo,
+        'parceiro': parceiro,
+        'porTipo': porTipo,
+        'tipos': tipos,
+        'tabela': tabela,
+        'blocos': blocos,
+        'restante': restante,
+        # ordem decrescente de todos os pares, para o top N sem um país escolhido
+        'ordem': np.argsort(-quantidades, kind='stable'),
+        'valores': valores,
+        'codigos': codigos,
+        'inicios': inicios,
+    }
+
+
+def construirRanking(df):
+    # Os pares (origem, tipo, asilo) são somados uma vez; os pares sem tipo saem deles.
+    # O resultado é compartilhado entre sessões: não deve ser alterado por quem o recebe.
+    pares = df.groupby(['NomePaisOrigem', 'TipoPopulacao', 'NomePaisAsilo'], observed=True)['Quantidade'].sum().reset_index()
+    return {(sentido, porTipo): rankingSentido(pares, sentido, porTipo)
+            for sentido in SENTIDOS for porTipo in (False, True)}
+
+
+def linhasOutros(ranking, paises, restantes):
+    # uma linha "Outros" por país (e tipo de população) com restante positivo
+    linhas = [(pais, tipo, int(valor))
+              for pais, restante in zip(paises, restantes)
+              for tipo, valor in zip(ranking['tipos'], restante) if valor > 0]
+    outros = pd.DataFrame(linhas, columns=[ranking['grupo'], 'TipoPopulacao', 'Quantidade'])
+    if not ranking['porTipo']:
+        outros = outros.drop(columns='TipoPopulacao')
+    outros[ranking['parceiro']] = 'Outros'
+    return outros
+
+
+def comOutros(top, outros):
+    if outros.empty:
+        return top
+    return pd.concat([top, outros]).sort_values('Quantidade', ascending=False, kind='stable')
+
+
+def topParceiros(ranking, pais, topn=None):
+    # os topn maiores parceiros de um país e o "Outros" com os demais
+    inicio, fim = ranking['blocos'].get(pais, (0, 0))
+    tabela = ranking['tabela']
+    if topn is None or inicio + topn >= fim:
+        return tabela.iloc[inicio:fim]
+    return comOutros(tabela.iloc[inicio:inicio + topn],
+                     linhasOutros(ranking, [pais], ranking['restante'][inicio + topn:inicio + topn + 1]))
+
+
+def topPares(ranking, topn=None):
+    # os topn maiores pares entre todos os países e um "Outros" por país com os demais
+    tabela = ranking['tabela']
+    if topn is None or topn >= len(tabela):
+        return tabela.take(ranking['ordem'])
+
+    selecionados = ranking['ordem'][:topn]
+    inicios = ranking['inicios']
+    # total de cada país menos o que entrou no top
+    restantes = ranking['restante'][inicios].copy()
+    blocos = np.searchsorted(inicios, selecionados, side='right') - 1
+    np.subtract.at(restantes, blocos, ranking['valores'][selecionados])
+    paises = ranking['tabela'][ranking['grupo']].cat.categories[ranking['codigos'][inicios]]
+    return comOutros(tabela.take(selecionados), linhasOutros(ranking, paises, restantes))
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+
+#################################################################
+# Arestas do diagrama de Sankey
+#################################################################
+
+def construirArestasSankey(df, etapas, valor='Quantidade'):
+    # Liga cada etapa à seguinte (ex.: origem -> tipo de população -> asilo) de uma vez,
+    # sem percorrer as linhas. Rótulos iguais em etapas diferentes compartilham o mesmo nó,
+    # e arestas repetidas são somadas antes de chegar ao Plotly.
+    valores = pd.concat([df[etapa].astype(object) for etapa in etapas], ignore_index=True)
+    codigos, rotulos = pd.factorize(valores, use_na_sentinel=False)
+    codigos = codigos.reshape(len(etapas), len(df))
+    quantidades = df[valor].to_numpy()
+
+    arestas = pd.DataFrame({
+        'source': np.concatenate(codigos[:-1]),
+        'target': np.concatenate(codigos[1:]),
+        'value': np.tile(quantidades, len(etapas) - 1),
+    })
+    arestas = arestas.groupby(['source', 'target'], sort=False)['value'].sum().reset_index()
+
+    return list(rotulos), arestas
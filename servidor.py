@@ -0,0 +1,68 @@
+import json
+import logging
+import os
+import sys
+
+from streamlit.web import cli
+
+import aquecimento
+import api
+
+
+#################################################################
+# Servidor
+#
+# Sobe o Streamlit com o dashboard no mesmo processo do aquecimento
+# (aquecimento.py), que preenche os caches antes da primeira sessão, e responde
+# em /pronto se a instância já está aquecida: 200 quando pronta, 503 antes
+# disso. O balanceador de carga deve usar esse endereço na verificação de saúde.
+# Na mesma porta fica a API de consultas (api.py), em /api/.
+#
+#   python servidor.py [opções do streamlit run, ex.: --server.port 8501]
+#################################################################
+
+logger = logging.getLogger('servidor')
+
+# porta do /pronto e da API; 0 desativa. DASHBOARD_PORTA_PRONTIDAO, o nome
+# anterior, continua valendo quando DASHBOARD_PORTA_API não está definida
+PORTA_AUXILIAR = int(os.environ.get('DASHBOARD_PORTA_API', os.environ.get('DASHBOARD_PORTA_PRONTIDAO', api.PORTA_API)))
+
+DASHBOARD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dashboard.py')
+
+
+class Prontidao(api.Consultas):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/pronto':
+            super().do_GET()
+            return
+        corpo = json.dumps(aquecimento.estado()).encode('utf-8')
+        self.send_response(200 if aquecimento.pronto() else 503)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        # as verificações do balanceador e as consultas são frequentes demais para o log padrão
+        logger.debug(formato, *args)
+
+
+def iniciarProntidao(porta=PORTA_AUXILIAR):
+    return api.iniciarApi(porta, Prontidao)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    if PORTA_AUXILIAR:
+        iniciarProntidao()
+    aquecimento.iniciarAquecimento()
+
+    # o Streamlit executa no processo atual: os caches preenchidos pelo aquecimento
+    # são os mesmos que as sessões consultam
+    sys.argv = ['streamlit', 'run', DASHBOARD] + sys.argv[1:]
+    return cli.main()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+#################################################################
+# Tabela paginada
+#
+# Busca, ordenação e paginação feitas no servidor: só as linhas da página
+# visível são materializadas e enviadas ao navegador.
+#################################################################
+
+# linhas convertidas por vez na exportação
+LINHAS_BLOCO = 50_000
+
+
+def colunasTexto(df):
+    return [coluna for coluna in df.columns
+            if isinstance(df[coluna].dtype, pd.CategoricalDtype) or df[coluna].dtype == object]
+
+
+def filtrarTabela(df, coluna, texto):
+    if not coluna or not texto:
+        return df
+
+    valores = df[coluna]
+    if isinstance(valores.dtype, pd.CategoricalDtype):
+        # compara só as categorias (poucas) e seleciona as linhas pelos códigos
+        categorias = valores.cat.categories
+        encontradas = categorias.str.contains(texto, case=False, regex=False)
+        filtro = np.isin(valores.cat.codes.to_numpy(), np.flatnonzero(encontradas))
+    else:
+        filtro = valores.astype(str).str.contains(texto, case=False, regex=False).to_numpy()
+    return df[filtro]
+
+
+def ordenarTabela(df, coluna, crescente=True):
+    # posições das linhas na ordem pedida; sem coluna, mantém a ordem atual
+    if not coluna:
+        return np.arange(len(df))
+
+    valores = df[coluna]
+    if isinstance(valores.dtype, pd.CategoricalDtype):
+        chave = valores.cat.codes.to_numpy()
+    else:
+        chave = valores.to_numpy()
+
+    ordem = np.argsort(chave, kind='stable')
+    return ordem if crescente else ordem[::-1]
+
+
+def totalPaginas(total, tamanho):
+    return max(1, -(-total // tamanho))
+
+
+def paginaTabela(df, ordem, pagina, tamanho):
+    # pagina começa em 1
+    inicio = (pagina - 1) * tamanho
+    return df.take(ordem[inicio:inicio + tamanho])
+
+
+def blocosTabela(df, ordem, linhas=LINHAS_BLOCO):
+    for inicio in range(0, len(ordem), linhas):
+        yield df.take(ordem[inicio:inicio + linhas])
+
+
+def exportarTabela(df, ordem, formato='csv'):
+    # Converte em blocos, sem materializar a tabela ordenada inteira nem o texto
+    # CSV completo de uma vez. O download_button do Streamlit só aceita bytes (ou
+    # texto/BytesIO) e mantém o arquivo inteiro em memória: o resultado é bytes.
+    arquivo = io.BytesIO()
+
+    if formato == 'parquet':
+        escritor = None
+        for bloco in blocosTabela(df, ordem):
+            tabela = pa.Table.from_pandas(bloco, preserve_index=False)
+            if escritor is None:
+                escritor = pq.ParquetWriter(arquivo, tabela.schema)
+            escritor.write_table(tabela)
+        if escritor is None:
+            pq.write_table(pa.Table.from_pandas(df.iloc[0:0], preserve_index=False), arquivo)
+        else:
+            escritor.close()
+    else:
+        cabecalho = True
+        for bloco in blocosTabela(df, ordem):
+            arquivo.write(bloco.to_csv(sep=';', index=False, header=cabecalho).encode('utf-8'))
+            cabecalho = False
+        if cabecalho:
+            arquivo.write(df.iloc[0:0].to_csv(sep=';', index=False).encode('utf-8'))
+
+    return arquivo.getvalue()
@@ -0,0 +1,144 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import api
+import carga
+
+VERSAO = 'teste-api'
+
+
+def dadosSinteticos():
+    rng = np.random.default_rng(0)
+    linhas = 400
+    paises = [('Brasil', 'BRA', 'Americas', 'South America', 'Americas'),
+              ('Chile', 'CHL', 'Americas', 'South America', 'Americas'),
+              ('Quenia', 'KEN', 'Africa', 'Eastern Africa', 'East and Horn of Africa'),
+              ('Franca', 'FRA', 'Europe', 'Western Europe', 'Europe')]
+    df = pd.DataFrame({'Ano': rng.integers(2000, 2011, linhas),
+                       'TipoPopulacao': rng.choice(['ASY', 'REF'], linhas),
+                       'Quantidade': rng.integers(1, 1000, linhas)})
+    for sentido, escolha in [('Origem', rng.integers(0, 4, linhas)), ('Asilo', rng.integers(0, 4, linhas))]:
+        for posicao, coluna in enumerate(['NomePais', 'SiglaPais', 'RegiaoUNSD', 'SubRegiaoUNSD', 'RegiaoUNHCR']):
+            df[coluna + sentido] = [paises[indice][posicao] for indice in escolha]
+    for coluna in df.columns:
+        if df[coluna].dtype == object:
+            df[coluna] = df[coluna].astype('category')
+    return df
+
+
+@pytest.fixture(autouse=True)
+def dadosApi(monkeypatch):
+    # a versão é fixa e as funções em cache do carga.py leem os dados sintéticos
+    df = dadosSinteticos()
+    monkeypatch.setattr(carga, 'versaoDados', lambda: VERSAO)
+    monkeypatch.setattr(carga, 'lerDados', lambda versao: df)
+    api._cache.clear()
+    yield df
+    api._cache.clear()
+
+
+def respostaJson(consulta, texto=''):
+    status, corpo, etag = api.responder(consulta, texto)
+    return status, json.loads(corpo), etag
+
+
+def test_anosTotaisPorAno(dadosApi):
+    status, resposta, _ = respostaJson('anos', 'anos=2002-2004')
+    assert status == 200
+    assert resposta['parametros']['anos'] == [2002, 2004]
+    esperado = dadosApi[dadosApi['Ano'].between(2002, 2004)].groupby('Ano')['Quantidade'].sum()
+    assert {linha['Ano']: linha['Quantidade'] for linha in resposta['dados']} == esperado.to_dict()
+
+
+def test_parametrosNormalizados():
+    # a mesma seleção escrita de outra forma tem a mesma chave (e o mesmo ETag)
+    _, padrao, etagPadrao = respostaJson('paises', 'top=2')
+    _, explicito, etagExplicito = respostaJson('paises', 'top=2&fluxo=Origem&tipos=REF,ASY&anos=1990-2030')
+    assert padrao['parametros'] == explicito['parametros']
+    assert padrao['parametros']['tipos'] == ['ASY', 'REF']
+    assert etagPadrao == etagExplicito
+    assert len(api._cache) == 1
+
+
+def test_regioesSelecionadas():
+    status, resposta, _ = respostaJson('regioes', 'campo=RegiaoUNSD&regioes=Africa,Europe')
+    assert status == 200
+    assert resposta['parametros']['regioes'] == ['Africa', 'Europe']
+    assert [linha['RegiaoUNSDOrigem'] for linha in resposta['dados']] == ['Africa', 'Europe']
+
+
+def test_revalidacaoComEtag():
+    status, corpo, etag = api.responder('tipos', '')
+    assert status == 200 and etag
+    status, corpo, etagRevalidado = api.responder('tipos', '', etag)
+    assert (status, corpo, etagRevalidado) == (304, b'', etag)
+    # qualquer um dos ETags da lista
+    assert api.responder('tipos', '', f'"outro", {etag}')[0] == 304
+    assert api.responder('tipos', '', '"outro"')[0] == 200
+
+
+def test_respostaDoCache(monkeypatch):
+    _, primeiro, _ = api.responder('paises', 'top=3')
+
+    def semConsulta(versao, parametros):
+        raise AssertionError('consulta refeita')
+    monkeypatch.setitem(api.CONSULTAS, 'paises', (semConsulta, api.CONSULTAS['paises'][1]))
+    assert api.responder('paises', 'top=3')[1] == primeiro
+
+
+def test_cacheLimitado(monkeypatch):
+    monkeypatch.setattr(api, 'TAMANHO_CACHE', 2)
+    for top in [1, 2, 3]:
+        api.responder('paises', f'top={top}')
+    assert len(api._cache) == 2
+    # a menos usada recentemente sai primeiro
+    assert not any('"top": 1' in chave for chave in api._cache)
+    api.responder('paises', 'top=2')
+    api.responder('paises', 'top=4')
+    assert any('"top": 2' in chave for chave in api._cache)
+    assert not any('"top": 3' in chave for chave in api._cache)
+
+
+@pytest.mark.parametrize('consulta, texto', [
+    ('anos', 'anos=abc'),
+    ('anos', 'anos=2010-2005'),
+    ('anos', 'anos=2030'),
+    ('fluxos', 'anos=1900-1910'),
+    ('anos', 'tipos=XXX'),
+    ('paises', 'fluxo=Destino'),
+    ('paises', 'top=0'),
+    ('regioes', 'campo=Continente'),
+    ('regioes', 'campo=RegiaoUNSD&regioes=Atlantida'),
+    ('fluxos', 'pais=Brasill'),
+])
+def test_parametrosInvalidos(consulta, texto):
+    status, resposta, etag = respostaJson(consulta, texto)
+    assert status == 400
+    assert 'erro' in resposta and etag is None
+    assert len(api._cache) == 0
+
+
+def test_consultaDesconhecida():
+    status, resposta, _ = respostaJson('nada')
+    assert status == 404
+    assert resposta['consultas'] == list(api.CONSULTAS)
+
+
+def test_fluxosDoPais(dadosApi):
+    status, resposta, _ = respostaJson('fluxos', 'pais=Brasil&top=1')
+    assert status == 200
+    parceiros = dadosApi[dadosApi['NomePaisOrigem'] == 'Brasil'].groupby('NomePaisAsilo', observed=True)['Quantidade'].sum()
+    maior = parceiros.idxmax()
+    # o maior parceiro e o "Outros" com os demais, em ordem decrescente de quantidade
+    assert {linha['NomePaisAsilo']: linha['Quantidade'] for linha in resposta['dados']} == {
+        maior: parceiros[maior], 'Outros': parceiros.sum() - parceiros[maior]}
+
+
+def test_paisDoSentidoPedido():
+    # o país é procurado entre os países do sentido escolhido
+    assert respostaJson('fluxos', 'pais=Franca&fluxo=Asilo&porTipo=1')[0] == 200
+    status, resposta, _ = respostaJson('fluxos', 'pais=Atlantida&fluxo=Asilo')
+    assert status == 400 and 'Atlantida' in resposta['erro']
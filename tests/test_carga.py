@@ -0,0 +1,54 @@
+import shutil
+import threading
+
+import pytest
+
+import aquecimento
+import carga
+import dados
+
+
+@pytest.fixture
+def versoes(tmp_path, monkeypatch):
+    # versões em disco e o manifesto apontando para `manifesto['versao']`
+    monkeypatch.setattr(dados, 'DIR_DADOS', str(tmp_path))
+    for versao in ['v1', 'v2']:
+        (tmp_path / dados.DIR_VERSOES / versao).mkdir(parents=True)
+    manifesto = {'versao': 'v1'}
+    monkeypatch.setattr(carga, 'versaoManifesto', lambda: manifesto['versao'])
+    monkeypatch.setattr(carga, '_versoes', {'ativa': None, 'aquecendo': None})
+    return manifesto
+
+
+def test_trocaDeVersaoDepoisDoAquecimento(versoes, monkeypatch):
+    liberar, aquecidas, trocou = threading.Event(), [], threading.Event()
+
+    def aquecerTroca(versao):
+        aquecidas.append(versao)
+        liberar.wait(5)
+
+    trocar = carga._trocarVersao
+    monkeypatch.setattr(aquecimento, 'aquecerTroca', aquecerTroca)
+    monkeypatch.setattr(carga, '_trocarVersao', lambda versao: (trocar(versao), trocou.set()))
+
+    assert carga.versaoDados() == 'v1'
+    versoes['versao'] = 'v2'
+    # enquanto a nova versão é aquecida, as sessões continuam na anterior, e o
+    # aquecimento não é iniciado de novo
+    assert carga.versaoDados() == 'v1'
+    assert carga.versaoDados() == 'v1'
+    liberar.set()
+    assert trocou.wait(5)
+    assert aquecidas == ['v2']
+    assert carga.versaoDados() == 'v2'
+
+
+def test_versaoAtivaRemovida(versoes, monkeypatch):
+    aquecidas = []
+    monkeypatch.setattr(carga, '_trocarVersao', aquecidas.append)
+    assert carga.versaoDados() == 'v1'
+    shutil.rmtree(dados.caminhoVersao('v1'))
+    versoes['versao'] = 'v2'
+    # sem a versão anterior em disco não há o que servir enquanto a nova aquece
+    assert carga.versaoDados() == 'v2'
+    assert aquecidas == []
@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+import dados
+
+
+@pytest.fixture
+def copiaLocal(tmp_path, monkeypatch):
+    # cópia local válida, verificada há mais que o TTL
+    monkeypatch.setattr(dados, 'DIR_DADOS', str(tmp_path))
+    caminho = dados.caminhoDados('v1')
+    (tmp_path / dados.DIR_VERSOES / 'v1').mkdir(parents=True)
+    open(caminho, 'w').close()
+    dados.gravarManifesto({'versao': 'v1', 'verificadoEm': time.time() - dados.TTL_DADOS - 1})
+
+
+def test_falhaNaAtualizacaoAdiaNovaTentativa(copiaLocal, monkeypatch):
+    downloads, agendadas = [], []
+
+    def downloadFalho(file_url, manifesto=None):
+        downloads.append(file_url)
+        raise OSError('origem fora do ar')
+
+    monkeypatch.setattr(dados, 'downloadDadosZip', downloadFalho)
+    monkeypatch.setattr(dados, 'agendarAtualizacao', agendadas.append)
+
+    assert dados.garantirDados('url')['versao'] == 'v1'
+    assert agendadas == ['url']
+    manifesto = dados.atualizarDados('url')
+    assert manifesto['versao'] == 'v1' and downloads == ['url']
+    assert dados.lerManifesto()['tentativaEm'] == manifesto['tentativaEm']
+
+    # dentro do intervalo, nem as execuções seguintes nem outra atualização tentam a origem
+    assert dados.garantirDados('url')['versao'] == 'v1'
+    assert dados.atualizarDados('url')['versao'] == 'v1'
+    assert agendadas == ['url'] and downloads == ['url']
+
+    # depois dele, a origem volta a ser tentada
+    monkeypatch.setattr(dados, 'INTERVALO_TENTATIVAS', 0)
+    dados.garantirDados('url')
+    assert agendadas == ['url', 'url']
+
+
+def test_atualizacaoDescartaTentativa(copiaLocal, monkeypatch):
+    dados.gravarManifesto(dict(dados.lerManifesto(), tentativaEm=time.time() - dados.INTERVALO_TENTATIVAS - 1))
+    monkeypatch.setattr(dados, 'downloadDadosZip',
+                        lambda file_url, manifesto=None: dict(manifesto, verificadoEm=time.time()))
+    manifesto = dados.atualizarDados('url')
+    assert 'tentativaEm' not in manifesto and 'tentativaEm' not in dados.lerManifesto()
+    assert dados.copiaLocalAtual(manifesto)
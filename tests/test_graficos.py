@@ -0,0 +1,24 @@
+import altair as alt
+import pandas as pd
+import pytest
+
+import graficos
+
+
+def grafico(linhas):
+    df = pd.DataFrame({'Ano': range(linhas), 'Quantidade': range(linhas)})
+    return alt.Chart(df).mark_line().encode(x='Ano:O', y='Quantidade:Q')
+
+
+def test_compactarRecusaLinhasBrutas():
+    with pytest.raises(alt.MaxRowsError):
+        graficos.compactarGrafico(grafico(graficos.LIMITE_LINHAS + 1))
+    # também nas camadas
+    with pytest.raises(alt.MaxRowsError):
+        graficos.compactarGrafico(grafico(10) + grafico(graficos.LIMITE_LINHAS + 1))
+
+
+def test_compactarReduzTipos():
+    compacto = graficos.compactarGrafico(grafico(100))
+    assert compacto.data['Quantidade'].dtype == 'int8'
+    assert len(compacto.data) == 100
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import cubo
+import hierarquia
+
+# país: (sigla, região UNHCR, continente, sub-região)
+PAISES = {
+    'Brasil': ('BRA', 'Americas', 'Americas', 'South America'),
+    'Chile': ('CHL', 'Americas', 'Americas', 'South America'),
+    'Mexico': ('MEX', 'Americas', 'Americas', 'Central America'),
+    'Quenia': ('KEN', 'East and Horn of Africa', 'Africa', 'Eastern Africa'),
+    'Sudao': ('SDN', 'East and Horn of Africa', 'Africa', None),
+    'Franca': ('FRA', 'Europe', 'Europe', 'Western Europe'),
+}
+FILTROS = [((2000, 2010), ['ASY', 'REF']), ((2003, 2006), ['REF']), ((2020, 2021), ['ASY'])]
+
+
+def dadosHierarquia(linhas=20_000):
+    # Quantidade em int32, como depois da leitura do CSV (dados.lerCsvTipado); os
+    # totais das regiões passam de 2^31
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({'Ano': rng.integers(2000, 2011, linhas).astype('int16'),
+                       'TipoPopulacao': pd.Categorical(rng.choice(['ASY', 'REF'], linhas)),
+                       'Quantidade': np.full(linhas, 1_000_000, dtype='int32')})
+    nomes = list(PAISES)
+    for sentido in cubo.SENTIDOS:
+        escolhidos = [nomes[posicao] for posicao in rng.integers(0, len(nomes), linhas)]
+        df['NomePais' + sentido] = escolhidos
+        for posicao, coluna in enumerate(['SiglaPais', 'RegiaoUNHCR', 'RegiaoUNSD', 'SubRegiaoUNSD']):
+            df[coluna + sentido] = [PAISES[nome][posicao] for nome in escolhidos]
+    for coluna in df.columns:
+        if df[coluna].dtype == object:
+            df[coluna] = df[coluna].astype('category')
+    return df
+
+
+@pytest.fixture(scope='module')
+def dados():
+    df = dadosHierarquia()
+    return df, hierarquia.construirEstrutura(cubo.construirCubo(df))
+
+
+def esperado(df, por):
+    return (df.groupby(por, observed=True)
+              .agg(Quantidade=('Quantidade', lambda valores: valores.astype('int64').sum()),
+                   Linhas=('Quantidade', 'size'))
+              .reset_index())
+
+
+def comparar(resultado, df, por):
+    pd.testing.assert_frame_equal(resultado.sort_values(por).reset_index(drop=True),
+                                  esperado(df, por).sort_values(por).reset_index(drop=True),
+                                  check_dtype=False, check_categorical=False)
+
+
+@pytest.mark.parametrize('filtroAnos, filtroTP', FILTROS)
+@pytest.mark.parametrize('coluna', ['RegiaoUNHCROrigem', 'RegiaoUNSDOrigem', 'SubRegiaoUNSDAsilo', 'NomePaisAsilo'])
+def test_consultarNivelIgualAoGroupby(dados, filtroAnos, filtroTP, coluna):
+    df, estrutura = dados
+    filtrado = df[df['Ano'].between(*filtroAnos) & df['TipoPopulacao'].isin(filtroTP)]
+    hierarquiaDados = hierarquia.construirHierarquia(estrutura, filtroAnos, filtroTP)
+    comparar(hierarquia.consultarNivel(hierarquiaDados, coluna), filtrado, [coluna])
+    comparar(hierarquia.consultarNivel(hierarquiaDados, coluna, porAno=True), filtrado, ['Ano', coluna])
+
+
+def test_totaisAcimaDe32Bits(dados):
+    df, estrutura = dados
+    hierarquiaDados = hierarquia.construirHierarquia(estrutura, (2000, 2010), ['ASY', 'REF'])
+    totais = hierarquia.consultarNivel(hierarquiaDados, 'RegiaoUNSDOrigem')
+    assert totais['Quantidade'].max() > 2 ** 31
+    assert totais['Quantidade'].sum() == len(df) * 1_000_000
+
+
+def test_subRegiaoNula(dados):
+    # o Sudão não tem sub-região: some do nível das sub-regiões, mas continua
+    # somando no continente e aparece no detalhamento dele
+    df, estrutura = dados
+    hierarquiaDados = hierarquia.construirHierarquia(estrutura, (2000, 2010), ['ASY', 'REF'])
+    subRegioes = hierarquia.consultarNivel(hierarquiaDados, 'SubRegiaoUNSDOrigem')
+    assert subRegioes['SubRegiaoUNSDOrigem'].notna().all()
+    africa = df[df['RegiaoUNSDOrigem'] == 'Africa']
+    detalhe = hierarquia.detalharValor(hierarquiaDados, 'RegiaoUNSDOrigem', 'Africa')
+    assert set(detalhe) == {'SubRegiaoUNSDOrigem', 'NomePaisOrigem'}
+    comparar(detalhe['SubRegiaoUNSDOrigem'], africa, ['SubRegiaoUNSDOrigem'])
+    comparar(detalhe['NomePaisOrigem'], africa, ['NomePaisOrigem'])
+    assert 'Sudao' in set(detalhe['NomePaisOrigem']['NomePaisOrigem'])
+    continentes = hierarquia.consultarNivel(hierarquiaDados, 'RegiaoUNSDOrigem')
+    assert continentes.set_index('RegiaoUNSDOrigem').loc['Africa', 'Quantidade'] == africa['Quantidade'].astype('int64').sum()
+
+
+@pytest.mark.parametrize('filtroAnos, filtroTP', FILTROS[:2])
+def test_detalharValorIgualAoGroupby(dados, filtroAnos, filtroTP):
+    df, estrutura = dados
+    filtrado = df[df['Ano'].between(*filtroAnos) & df['TipoPopulacao'].isin(filtroTP)]
+    hierarquiaDados = hierarquia.construirHierarquia(estrutura, filtroAnos, filtroTP)
+    for coluna, valor in [('RegiaoUNSDAsilo', 'Americas'), ('SubRegiaoUNSDAsilo', 'South America'),
+                          ('RegiaoUNHCRAsilo', 'East and Horn of Africa')]:
+        selecao = filtrado[filtrado[coluna] == valor]
+        for abaixo, tabela in hierarquia.detalharValor(hierarquiaDados, coluna, valor, porAno=True).items():
+            comparar(tabela, selecao, ['Ano', abaixo])
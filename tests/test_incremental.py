@@ -0,0 +1,54 @@
+import os
+
+import pandas as pd
+import pytest
+
+import benchmark
+import dados
+import derivados
+
+
+def normalizar(tabela):
+    # mesma tabela independente da ordem das linhas e das categorias
+    tabela = tabela.copy()
+    for coluna in tabela.columns:
+        if isinstance(tabela[coluna].dtype, pd.CategoricalDtype):
+            tabela[coluna] = tabela[coluna].astype(object)
+    return tabela.sort_values(list(tabela.columns)).reset_index(drop=True)
+
+
+def lerDerivados(diretorio):
+    return {nome[:-len('.parquet')]: normalizar(derivados.lerTabela(diretorio, nome[:-len('.parquet')]))
+            for nome in sorted(os.listdir(diretorio))}
+
+
+@pytest.mark.parametrize('modo', ['substituir', 'acrescentar'])
+def test_incrementalIgualAReconstrucao(tmp_path, modo):
+    base = benchmark.gerarDados(3000, semente=0)
+    novos = benchmark.gerarDados(600, semente=1)
+    novos = novos[novos['Ano'].isin([2015, 2022, 2023])].reset_index(drop=True)
+
+    dados.gravarParticoes(base, str(tmp_path / 'base' / 'particoes'))
+    derivados.gravarDerivados(base, str(tmp_path / 'base' / 'derivados'))
+
+    # o caminho do preprocessar.py --incremental
+    os.makedirs(tmp_path / 'nova')
+    particoes = str(tmp_path / 'nova' / 'particoes')
+    anos = dados.atualizarParticoes(str(tmp_path / 'base' / 'particoes'), particoes, novos, modo)
+    assert anos == [2015, 2022, 2023]
+    afetados = dados.lerParticoes(particoes, (anos[0], anos[-1]))
+    afetados = afetados[afetados['Ano'].isin(anos)]
+    derivados.gravarDerivados(afetados, str(tmp_path / 'nova' / 'derivados'), str(tmp_path / 'base' / 'derivados'))
+
+    # reconstrução completa a partir das linhas finais
+    mantidas = base if modo == 'acrescentar' else base[~base['Ano'].isin(anos)]
+    completo = pd.concat(dados.unirCategorias(mantidas, novos), ignore_index=True)
+    derivados.gravarDerivados(completo, str(tmp_path / 'completo' / 'derivados'))
+
+    pd.testing.assert_frame_equal(normalizar(dados.lerParticoes(particoes)), normalizar(completo[list(base.columns)]),
+                                  check_dtype=False)
+    incremental = lerDerivados(tmp_path / 'nova' / 'derivados')
+    reconstruido = lerDerivados(tmp_path / 'completo' / 'derivados')
+    assert set(incremental) == set(reconstruido)
+    for nome in reconstruido:
+        pd.testing.assert_frame_equal(incremental[nome], reconstruido[nome], check_dtype=False, obj=nome)
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+import indice
+
+
+def dadosIndice():
+    rng = np.random.default_rng(1)
+    linhas = 300
+    return pd.DataFrame({'Ano': rng.integers(2000, 2011, linhas),
+                         'TipoPopulacao': pd.Categorical(rng.choice(['ASY', 'OIP', 'REF'], linhas)),
+                         'Quantidade': rng.integers(1, 100, linhas)})
+
+
+def test_filtroIgualAMascara():
+    df = dadosIndice()
+    indiceDados = indice.construirIndice(df)
+    for filtroAnos, filtroTP in [((2002, 2005), ['ASY', 'REF']), ((2000, 2010), ['OIP']), ((2003, 2003), [])]:
+        esperado = df[df['Ano'].between(*filtroAnos) & df['TipoPopulacao'].isin(filtroTP)]
+        resultado = indice.filtrarIndice(indiceDados, filtroAnos, filtroTP)
+        pd.testing.assert_frame_equal(resultado.sort_index(), esperado.sort_index())
+
+
+def test_memoGuardaSoAsFaixas():
+    indiceDados = indice.construirIndice(dadosIndice())
+    primeiro = indice.filtrarIndice(indiceDados, (2002, 2005), ['ASY', 'REF'])
+    # o mesmo filtro em outra ordem reaproveita as faixas
+    segundo = indice.filtrarIndice(indiceDados, (2002, 2005), ['REF', 'ASY'])
+    pd.testing.assert_frame_equal(primeiro, segundo)
+    assert len(indiceDados['memo']) == 1
+    faixas = next(iter(indiceDados['memo'].values()))
+    assert faixas == indice.faixasIndice(indiceDados, (2002, 2005), ['ASY', 'REF'])
+    assert sum(b - a for a, b in faixas) == len(primeiro)
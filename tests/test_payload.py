@@ -0,0 +1,46 @@
+from streamlit.testing.v1 import AppTest
+
+
+def scriptPayload():
+    import altair as alt
+    import pandas as pd
+    import streamlit as st
+
+    import dashboard
+
+    # o tamanho só é medido com o painel de desempenho ou o arquivo de perfil ativos
+    dashboard._MEDIR_PAYLOAD_ = True
+    grafico = alt.Chart(pd.DataFrame({'a': [1, 2], 'b': [3, 4]})).mark_bar().encode(x='a:O', y='b:Q')
+    st.session_state['payloadExecucao'] = {}
+    # a aba geral reexecutada (como um fragmento) três vezes e o mapa uma vez
+    for _ in range(3):
+        dashboard.iniciarPayloadFragmento('abaGeral')
+        dashboard.exibirGrafico(grafico, 'geral')
+    dashboard.iniciarPayloadFragmento('abaMapa')
+    dashboard.exibirGrafico(grafico, 'mapa')
+    st.session_state['relatorio'] = dashboard.relatorioPayload()
+
+
+def test_payloadNaoSomaReexecucoesDoFragmento():
+    at = AppTest.from_function(scriptPayload, default_timeout=60).run()
+    assert not at.exception
+    relatorio = at.session_state['relatorio']
+    assert list(relatorio['Gráfico']) == ['geral', 'mapa']
+
+
+def scriptSemMedicao():
+    import altair as alt
+    import pandas as pd
+    import streamlit as st
+
+    import dashboard
+
+    dashboard._MEDIR_PAYLOAD_ = False
+    grafico = alt.Chart(pd.DataFrame({'a': [1, 2], 'b': [3, 4]})).mark_bar().encode(x='a:O', y='b:Q')
+    dashboard.exibirGrafico(grafico, 'geral')
+
+
+def test_payloadSemMedicao():
+    at = AppTest.from_function(scriptSemMedicao, default_timeout=60).run()
+    assert not at.exception
+    assert 'payloadGraficos' not in at.session_state
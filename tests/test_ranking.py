@@ -0,0 +1,30 @@
+import pandas as pd
+
+import ranking
+
+
+def dadosPares():
+    return pd.DataFrame({
+        'NomePaisOrigem': pd.Categorical(['A', 'A', 'A', 'B']),
+        'TipoPopulacao': pd.Categorical(['REF', 'ASY', 'REF', 'REF']),
+        'NomePaisAsilo': pd.Categorical(['X', 'Y', 'Z', 'X']),
+        'Quantidade': [10, 5, 1, 7],
+    })
+
+
+def test_rankingTopParceirosComOutros():
+    rankingDados = ranking.construirRanking(dadosPares())
+    top = ranking.topParceiros(rankingDados[('Origem', False)], 'A', 1)
+    assert list(top['NomePaisAsilo']) == ['X', 'Outros']
+    assert list(top['Quantidade']) == [10, 6]
+
+
+def test_rankingFiltroVazio():
+    # nenhum tipo de população selecionado: o filtro não tem linhas
+    rankingDados = ranking.construirRanking(dadosPares().iloc[0:0])
+    for (sentido, porTipo), rankingSentido in rankingDados.items():
+        assert rankingSentido['tabela'].empty
+        assert rankingSentido['blocos'] == {}
+        assert ranking.topParceiros(rankingSentido, 'A', 10).empty
+        assert ranking.topPares(rankingSentido, 10).empty
+        assert ranking.topPares(rankingSentido).empty
@@ -0,0 +1,41 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+import tabela
+
+
+def dadosTabela(linhas):
+    return pd.DataFrame({
+        'NomePaisOrigem': pd.Categorical([f'P{i % 3}' for i in range(linhas)]),
+        'Quantidade': np.arange(linhas),
+    })
+
+
+def test_exportarCsv():
+    # mais de um bloco, para cobrir a concatenação (só o primeiro leva cabeçalho)
+    df = dadosTabela(2 * tabela.LINHAS_BLOCO + 1)
+    ordem = np.arange(len(df))[::-1]
+    exportado = tabela.exportarTabela(df, ordem, 'csv')
+    lido = pd.read_csv(io.BytesIO(exportado), sep=';')
+    assert list(lido['Quantidade']) == list(df['Quantidade'].take(ordem))
+
+
+def test_exportarParquet():
+    df = dadosTabela(2 * tabela.LINHAS_BLOCO + 1)
+    exportado = tabela.exportarTabela(df, np.arange(len(df)), 'parquet')
+    assert pq.read_table(io.BytesIO(exportado)).num_rows == len(df)
+
+
+def test_exportacaoAceitaPeloDownloadButton():
+    # o download_button converte o retorno do callable com esta função
+    for linhas in [0, 5]:
+        df = dadosTabela(linhas)
+        for formato in ['csv', 'parquet']:
+            exportado = tabela.exportarTabela(df, np.arange(linhas), formato)
+            assert isinstance(exportado, bytes)
+            dados, _ = convert_data_to_bytes_and_infer_mime(exportado, RuntimeError('tipo não suportado'))
+            assert dados == exportado